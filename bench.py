@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Benchmarks of the hot paths, on their own and end to end.
+# Every benchmark builds what it needs once and returns an operation, a
+# function that does one unit of work (one deck reset, one hand scored, one
+# round played...). The operation is timed in batches for a fixed time and the
+# best batch is kept (the fastest batch is the one least disturbed by the rest
+# of the machine), then run again under tracemalloc to measure how much memory
+# it allocates and how many blocks it leaves behind. While it is measured, every
+# object that existed before the call is kept alive, so the objects it frees
+# (the cards of the last deck, the last hand...) don't cancel out the ones it
+# allocates in their place.
+#
+# Results can be saved as JSON (--json) and compared against a saved run
+# (--baseline): anything slower than the tolerance is reported as a regression
+# and the exit status is 1.
+
+import contextlib
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+import engine
+from blackjack import Card, Dealer, Deck, Player, blackjack, rank_indexes, suits
+from pacing import Pacer
+from policy import ThresholdPolicy
+from screen import Screen
+from shoe import Shoe
+
+
+WIDTH = 80
+# Time spent timing each benchmark, split in REPEAT batches
+SECONDS = 1.0
+REPEAT = 20
+# Slowdown against a baseline reported as a regression
+TOLERANCE = 0.25
+
+
+@dataclass
+class Result:
+    name: str
+    # What one operation is (a card, a hand, a round...)
+    unit: str
+    ops_per_sec: float
+    ns_per_op: float
+    # Memory allocated by one operation, in bytes (what it frees is not taken off)
+    alloc_bytes: float
+    # Memory blocks still allocated after one operation (caches filling up, leaks)
+    blocks: float
+
+
+class _Null:
+    # Output that goes nowhere, for the console game
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, unit: str, items: int = 1):
+    # Register a benchmark. The decorated function builds and returns the operation,
+    # which does `items` units of work every call
+    def register(function):
+        BENCHMARKS[name] = (function, unit, items)
+        return function
+    return register
+
+
+@benchmark("deck_reset_shuffle", "deck")
+def deck_reset_shuffle():
+    deck = Deck()
+    rng = random.Random(1)
+
+    def operation():
+        deck.reset()
+        deck.shuffle(rng)
+    return operation
+
+
+@benchmark("shoe_reset_shuffle", "deck")
+def shoe_reset_shuffle():
+    shoe = Shoe(random.Random(1))
+    return shoe.reset
+
+
+@benchmark("draw_card", "card", items=52)
+def draw_card():
+    deck = Deck()
+    deck.shuffle(random.Random(1))
+
+    def operation():
+        # Deal the same 52 cards again, the second card face down like the dealer's
+        deck.shoe.position = 0
+        draw = deck.draw_card
+        for _ in range(26):
+            draw(faceup=True)
+            draw(faceup=False)
+    return operation
+
+
+@benchmark("shoe_draw", "card", items=52)
+def shoe_draw():
+    shoe = Shoe(random.Random(1))
+
+    def operation():
+        shoe.position = 0
+        draw = shoe.draw
+        for _ in range(52):
+            draw()
+    return operation
+
+
+@benchmark("get_points", "hand")
+def get_points():
+    # A hand with two Aces to soften: 11, 12, 21, then 16 once an Ace counts as 1
+    deck = Deck()
+    by_rank = {card.rank: card for card in deck.views}
+    cards = [by_rank[rank] for rank in ("Ace", "Ace", "Nine", "Five")]
+    player = Player(deck=deck)
+
+    def operation():
+        player.reset_cards()
+        hand = player.hand
+        for card in cards:
+            hand.deal(card, rank_indexes[card.rank])
+            player.get_points()
+    return operation
+
+
+@benchmark("ascii_version_of_card", "hand")
+def ascii_version_of_card():
+    cards = [Card(suit, rank) for suit, rank in zip(suits, ("Ace", "Ten", "Queen"))]
+
+    def operation():
+        Card.ascii_version_of_card(*cards)
+    return operation
+
+
+def _table(rng: random.Random):
+    # A dealer with their hole card down and a player with three cards, as in the middle of a round
+    deck = Deck()
+    deck.shuffle(rng)
+    dealer = Dealer(deck)
+    player = Player(name="bench", deck=deck)
+    player.pickup()
+    dealer.pickup()
+    player.pickup()
+    dealer.pickup()
+    player.pickup()
+    return dealer, player
+
+
+@benchmark("dealer_str", "render")
+def dealer_str():
+    dealer, _ = _table(random.Random(1))
+    return dealer.__str__
+
+
+@benchmark("player_str", "render")
+def player_str():
+    _, player = _table(random.Random(1))
+    return player.__str__
+
+
+@benchmark("settle", "hand", items=256)
+def settle():
+    # Settle the same 256 dealt hands against their dealer, every outcome comes up
+    shoe = Shoe(random.Random(1))
+    pairs = []
+    for _ in range(256):
+        shoe.reset()
+        player = engine.hand_total([shoe.draw(), shoe.draw()])
+        dealer = engine.hand_total([shoe.draw(), shoe.draw(), shoe.draw()])
+        pairs.append((player, dealer))
+
+    def operation():
+        for player, dealer in pairs:
+            engine.settle(player, dealer, 10, 5)
+    return operation
+
+
+@benchmark("engine_round", "hand")
+def engine_round():
+    shoe = Shoe(random.Random(1), decks=6, penetration=0.75)
+    policy = ThresholdPolicy()
+
+    def operation():
+        engine.play_round(policy, 10, shoe)
+    return operation
+
+
+CONSOLE_ROUNDS = 100
+
+
+class _Done(Exception):
+    pass
+
+
+@benchmark("console_round", "hand", items=CONSOLE_ROUNDS)
+def console_round():
+    # Whole rounds of the console game: betting, dealing, decisions, drawing the table, settling.
+    # No pauses, output discarded, diffed frames as on an ANSI terminal
+    rng = random.Random(1)
+    policy = ThresholdPolicy()
+    null = _Null()
+
+    def operation():
+        rounds = 0
+        bet_next = False
+
+        def on_round(player):
+            nonlocal rounds, bet_next
+            if rounds == CONSOLE_ROUNDS:
+                raise _Done
+            rounds += 1
+            bet_next = True
+            # Never go bankrupt halfway through
+            player.money = 1000
+
+        def read() -> str:
+            nonlocal bet_next
+            if rounds == 0:
+                return "bench"
+            if bet_next:
+                bet_next = False
+                return "10"
+            return "y"
+
+        with contextlib.redirect_stdout(null):
+            try:
+                blackjack(policy, WIDTH, rng, Screen(ansi=True, rows=100, stream=null), Pacer("fast"),
+                          read=read, on_round=on_round)
+            except _Done:
+                pass
+    return operation
+
+
+def _keep_alive() -> list:
+    # References to every object the garbage collector knows of and to everything they refer to
+    # (strings and numbers too), so none of them is freed while they are held
+    objects = gc.get_objects()
+    return [objects, gc.get_referents(*objects)]
+
+
+def measure(name: str, seconds: float = SECONDS, repeat: int = REPEAT) -> Result:
+    """Run one benchmark, timing it for about `seconds` in total."""
+    build, unit, items = BENCHMARKS[name]
+    operation = build()
+    operation()
+
+    # Enough calls per batch for a batch to take seconds / repeat
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds / repeat / 4:
+            break
+        loops *= 4
+    loops = max(1, int(loops * seconds / repeat / elapsed))
+    best = float("inf")
+    # Without the garbage collector, as timeit does: when it runs depends on everything allocated before
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                operation()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    per_item = best / loops / items
+
+    # Memory, on fewer calls (tracemalloc slows everything down)
+    calls = max(1, min(loops, 200))
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        allocated = 0
+        blocks = sys.getallocatedblocks()
+        for _ in range(calls):
+            alive = _keep_alive()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            operation()
+            allocated += tracemalloc.get_traced_memory()[1] - current
+            del alive
+        gc.collect()
+        blocks = sys.getallocatedblocks() - blocks
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    return Result(name, unit, 1 / per_item, per_item * 1e9, allocated / calls / items, blocks / calls / items)
+
+
+def run(names: list = None, seconds: float = SECONDS, repeat: int = REPEAT) -> list:
+    return [measure(name, seconds, repeat) for name in (names if names is not None else BENCHMARKS)]
+
+
+def save(results: list, path: str):
+    with open(path, "w") as file:
+        json.dump({"python": platform.python_version(),
+                   "machine": platform.machine(),
+                   "results": {result.name: asdict(result) for result in results}}, file, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return {name: Result(**result) for name, result in json.load(file)["results"].items()}
+
+
+def compare(results: list, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """Names of the benchmarks more than tolerance (a fraction) slower than in the baseline."""
+    return [result.name for result in results
+            if result.name in baseline and result.ns_per_op > baseline[result.name].ns_per_op * (1 + tolerance)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark dealing, scoring, rendering and whole rounds")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (all by default): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--seconds", type=float, default=SECONDS, help="time spent timing each benchmark")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="batches the time is split in, the fastest one counts")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="slowdown reported as a regression")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    baseline = load(args.baseline) if args.baseline else {}
+
+    results = []
+    print(f"{'benchmark':<22}{'per second':>14}{'ns':>12}{'bytes':>10}{'blocks':>9}" +
+          (f"{'baseline':>10}" if baseline else ""))
+    for name in args.names or BENCHMARKS:
+        result = measure(name, args.seconds, args.repeat)
+        results.append(result)
+        line = (f"{name:<22}{result.ops_per_sec:>10,.0f}/{result.unit:<5}{result.ns_per_op:>10,.0f}"
+                f"{result.alloc_bytes:>10,.0f}{result.blocks:>9.2f}")
+        if name in baseline:
+            line += f"{result.ns_per_op / baseline[name].ns_per_op - 1:>+10.1%}"
+        print(line)
+
+    if args.json:
+        save(results, args.json)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Slower than the baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
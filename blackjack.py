@@ -7,10 +7,17 @@
 
 
 import random
-import time
-import os
-width = os.get_terminal_size().columns
-from IPython.display import clear_output
+import shutil
+from policy import ConsolePolicy, Observation
+from hand import Hand
+from scoring import HandTotal
+from cards import encode, new_deck
+from glyphs import BACK, card_art, render_cards
+from screen import Screen
+from shoe import Shoe
+from pacing import BUST, DEAL, DEALER_CARD, DEALER_DONE, DEALER_DRAW, REVEAL, SETTLE, Pacer
+import metrics as phases
+from metrics import DISABLED, Metrics
 
 
 # ## Define Unchanging Values
@@ -18,10 +25,16 @@ from IPython.display import clear_output
 # In[2]:
 
 
+# Width of the terminal, asked for when the game starts rather than at import (80 columns if there is no terminal)
+def terminal_width() -> int:
+    return shutil.get_terminal_size((80, 24)).columns
+
+
 # Unchanging values
 suits = ['Spades', 'Diamonds', 'Hearts', 'Clubs']
 suits_symbols = ['♠', '♦', '♥', '♣'] # Use this to prints the appropriate icons for each card
 ranks = ["Ace", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Jack", "Queen", "King"]
+rank_indexes = {rank: index for index, rank in enumerate(ranks)} # Hand totals are tracked by rank index (see scoring.py)
 values = {"Ace": 11, # Default value of Ace is 11 unless total is greater than 21 in that case the value of Ace has to be changed to 1
           "Two": 2,
           "Three": 3,
@@ -49,12 +62,14 @@ values = {"Ace": 11, # Default value of Ace is 11 unless total is greater than 2
 
 
 class Card:
-    def __init__(self, suit: str, rank: str, faceup: bool = True):
+    # code is the card's code in cards.py, given by Deck so it is not looked up from the names again
+    def __init__(self, suit: str, rank: str, faceup: bool = True, code: int = None):
         self.suit = suit
         self.rank = rank
         # First dealer card is facedown, so cards need to have a property that they're either faceup or facedown
         self.faceup = faceup
         self.value = values[rank]
+        self.code = encode(suit, rank) if code is None else code
 
     def flip(self):
         if self.faceup == True:
@@ -65,70 +80,22 @@ class Card:
             self.faceup = True
             self.value = values[self.rank]
             
+    # Card code used to look up its art (see cards.py and glyphs.py), or the back if the card is face down
+    @property
+    def glyph(self) -> int:
+        return self.code if self.faceup else BACK
+
     def ascii_version_of_card(*cards):
 #     """
 #     Instead of a boring text version of the card we render an ASCII image of the card.
 #     :param cards: One or more card objects
-#     :param return_string: By default we return the string version of the card, but the dealer hide the 1st card and we
-#     keep it as a list so that the dealer can add a hidden card in front of the list
 #     """
+        # ascii version of hidden cards
+        if any(card.faceup == False for card in cards):
+            return card_art(BACK)
+        # The art of every card is drawn once in glyphs.py
+        return render_cards(tuple(card.code for card in cards), 12 * len(cards)).rstrip("\n")
 
-        # Need to convert written numbers to actual number strings to display on cards
-        rank_conversion = {"Ace": "Ace",
-          "Two": "2",
-          "Three": "3",
-          "Four": "4",
-          "Five": "5",
-          "Six": "6",
-          "Seven": "7",
-          "Eight": "8",
-          "Nine": "9",
-          "Ten": "10",
-          "Jack": "Jack",
-          "Queen": "Queen",
-          "King": "King"}
-        
-        # Use this to prints the appropriate icons for each card
-        suits_symbols = {'Spades':'♠','Diamonds':'♦','Hearts':'♥','Clubs':'♣'} 
-        
-        
-        # create an empty list of list, each sublist is a line
-        lines = [[] for i in range(9)]
-
-        for card in cards:
-            # ascii version of hidden cards
-            if card.faceup == False:
-                lines = ['┌─────────┐'] + ['│░░░░░░░░░│'] * 7 + ['└─────────┘']
-                return '\n'.join(lines)
-            
-            # "King" should be "K" and "10" should still be "10"
-            if rank_conversion[card.rank] == '10':  # ten is the only one who's rank is 2 char long
-                rank = rank_conversion[card.rank]
-                space = ''  # if we write "10" on the card that line will be 1 char to long
-            else:
-                rank = rank_conversion[card.rank][0]  # some have a rank of 'King' this changes that to a simple 'K' ("King" doesn't fit)
-                space = ' '  # no "10", we use a blank space to will the void
-            
-            # get the cards suit
-            suit = suits_symbols[card.suit]
-
-            # add the individual card on a line by line basis
-            lines[0].append('┌─────────┐')
-            lines[1].append('│{}{}       │'.format(rank, space))  # use two {} one for char, one for space or char
-            lines[2].append('│         │')
-            lines[3].append('│         │')
-            lines[4].append('│    {}    │'.format(suit))
-            lines[5].append('│         │')
-            lines[6].append('│         │')
-            lines[7].append('│       {}{}│'.format(space, rank))
-            lines[8].append('└─────────┘')
-
-        # return the full card    
-        result = []
-        for index, line in enumerate(lines):
-            result.append(''.join(lines[index]))
-        return '\n'.join(result)
-    
     def __str__(self) -> str:
         if self.faceup == True:
             return f"{self.rank} of {self.suit}"
@@ -141,42 +108,46 @@ class Card:
 # In[4]:
 
 
+# Suit and rank of every card code, in the order Deck builds its cards
+card_names = [(suit, rank) for suit in suits for rank in ranks]
+unshuffled_deck = new_deck()
+
+
 class Deck:
+    # The cards are dealt from a one deck Shoe (see shoe.py): a buffer of card codes and a cursor.
+    # reset() puts the buffer back in order and rewinds the cursor instead of building 52 new Cards,
+    # and the Card a card is dealt as is one of 52 made once, turned to the side it is dealt on
     def __init__(self):
-        self.all_cards = []
-        for suit in suits:
-            for rank in ranks:
-                self.all_cards.append(Card(suit, rank))
-    
-    def shuffle(self):
-        random.shuffle(self.all_cards)
-        
+        self.shoe = Shoe(random, shuffled=False)
+        self.views = [Card(suit, rank, code=code) for code, (suit, rank) in enumerate(card_names)]
+
+    def upcoming(self, count: int) -> list:
+        # Codes of the next count cards to be dealt
+        return self.shoe.cards[self.shoe.position:self.shoe.position + count].tolist()
+
+    # rng can be a random.Random instance so each game/worker gets its own reproducible stream
+    def shuffle(self, rng = random):
+        cards = self.shoe.cards
+        rng.shuffle(cards)
+        # Dealt from the front, in the order the list of Cards used to be dealt from its end,
+        # so a seeded game deals the same cards
+        cards.reverse()
+        self.shoe.position = 0
+
     def draw_card(self, faceup: bool = True):
-        # check if you want the card to be drawn face up or face down
-        if faceup == True:
-            # if the card property of the one you're about to pick out (pop default index is -1) is set to False, flip it
-            if self.all_cards[-1].faceup == False:
-                self.all_cards[-1].flip()
-                return self.all_cards.pop()
-            else: 
-                return self.all_cards.pop()
-        # check if you want the card to be drawn face up or face down
-        elif faceup == False:
-            # if the card property of the one you're about to pick out is set to True, flip it
-            if self.all_cards[-1].faceup == True:
-                self.all_cards[-1].flip()
-                return self.all_cards.pop()
-            else: 
-                return self.all_cards.pop()
-    
+        card = self.views[self.shoe.draw()]
+        # Turn the card to the side it is drawn on (a face down card is not counted until it is shown)
+        if card.faceup != faceup:
+            card.flip()
+        return card
+
     def reset(self):
-        Deck.__init__(self)
-    
-    def __str__(self) -> str:
-        return f"Deck has {len(self.all_cards)} cards"
+        # Every card back in the deck, in order
+        self.shoe.cards[:] = unshuffled_deck
+        self.shoe.position = 0
 
-# Instantiate deck
-blackjack_deck = Deck()
+    def __str__(self) -> str:
+        return f"Deck has {self.shoe.remaining()} cards"
 
 
 # ## Create Dealer Object
@@ -186,23 +157,29 @@ blackjack_deck = Deck()
 
 class Dealer:
         
-    def __init__(self, points: int = 0):
+    # deck is the Deck of the table this dealer deals from
+    def __init__(self, deck: Deck = None, points: int = 0):
+        self.deck = deck
         self.points = points
         self.dealer_hand = []
+        # Score of the face up cards, updated one card at a time (see scoring.py)
+        self.hand_total = HandTotal()
     
     def get_points(self):
-        self.points = sum(Card.value for Card in self.dealer_hand)
+        self.points = self.hand_total.points
         return self.points
     
     # pick up cards
     def pickup(self):
         # If this is the first card in the dealer's hand, pickup facedown
         if len(self.dealer_hand) == len([]):
-            self.dealer_hand.append(blackjack_deck.draw_card(faceup = False))
+            self.dealer_hand.append(self.deck.draw_card(faceup = False))
             self.get_points()
         # Otherwise pick it up and place it face up on the table
         else:
-            self.dealer_hand.append(blackjack_deck.draw_card(faceup = True))
+            card = self.deck.draw_card(faceup = True)
+            self.dealer_hand.append(card)
+            self.hand_total.add(rank_indexes[card.rank])
             self.get_points()
 
     # flip any cards that are face down (and reveal their value)        
@@ -211,30 +188,23 @@ class Dealer:
             if card.faceup == False:
                 card.flip()
                 self.dealer_hand[index] = card
+                self.hand_total.add(rank_indexes[card.rank])
                 self.get_points()
     
     def reset(self):
-        Dealer.__init__(self)
+        Dealer.__init__(self, deck=self.deck)
             
     def __str__(self) -> str:
-        gen_exp = (card for card in self.dealer_hand)
-        new_list = []
-        for x in gen_exp:
-            new_list.append(Card.ascii_version_of_card(x))
-        lines = [card.splitlines() for card in new_list]
-        zipped_lines = list(zip(*lines))
-        formatted_card_output_side_by_side = ""
-        for index, line in enumerate(list(zipped_lines)):
-            formatted_card_output_side_by_side += " "*(int(width/2 - 12*len(list(zipped_lines)[index])/2)) + "".join(list(zipped_lines)[index]) + "\n"
+        return self.render(terminal_width())
+
+    def render(self, width: int) -> str:
+        formatted_card_output_side_by_side = render_cards(tuple(card.glyph for card in self.dealer_hand), width)
         nl = '\n'
         sentence_length = len(f"Dealer has {len(self.dealer_hand)} cards and {self.get_points()} points")
         if len(self.dealer_hand) < 1:
             return f"{' '*int(width/2 - sentence_length/2)}Dealer has {len(self.dealer_hand)} cards and {self.get_points()} points"
         else:
             return f"{' '*int(width/2 - sentence_length/2)}Dealer has {len(self.dealer_hand)} cards and {self.get_points()} points \n{formatted_card_output_side_by_side}"
-        
-# Instantiate dealer
-dealer = Dealer()
 
 
 # ## Create Player Object
@@ -255,9 +225,19 @@ class Player:
                  losses: int = 0,
                  standing: bool = False,
                  doubled_down: bool = False,
-                 at_table: bool = True
+                 at_table: bool = True,
+                 deck: Deck = None,
+                 read = input
                  ):
+        # The player starts with one hand, splitting adds more (up to max_hands)
+        # current_hand is the index of the hand being played, player_hand/current_bet/hand_total refer to it
+        self.hands = [Hand()]
+        self.current_hand = 0
         self.name = name
+        # Deck of the table the player sits at
+        self.deck = deck
+        # Where betting answers are read from
+        self.read = read
         self.money = money
         self.points = points
         self.current_bet = current_bet
@@ -268,31 +248,37 @@ class Player:
         self.standing = standing
         self.doubled_down = doubled_down
         self.at_table = at_table
-        self.player_hand = []
-# ATTEMPT AT SPLITTING
-#         self.player_hand_2 = []
-#         self.player_hand_3 = []
-#         self.player_hand_4 = []
-#         self.points_2 = 0
-#         self.points_3 = 0
-#         self.points_4 = 0
-
-    def get_points(self, hand: int = 1):
-        if hand == 1:
-            self.points = sum(Card.value for Card in self.player_hand)
+
+    max_hands = 4
+    ordinals = ["first", "second", "third", "fourth"]
+
+    @property
+    def hand(self) -> Hand:
+        return self.hands[self.current_hand]
+
+    @property
+    def player_hand(self) -> list:
+        return self.hand.cards
+
+    @property
+    def hand_total(self) -> Hand:
+        # Score of the hand, updated one card at a time (see scoring.py)
+        return self.hand
+
+    @property
+    def current_bet(self) -> int:
+        return self.hand.bet
+
+    @current_bet.setter
+    def current_bet(self, amount: int):
+        self.hand.bet = amount
+
+    def get_points(self, hand: int = None):
+        # hand is the number of a split hand (1-4), the hand being played by default
+        if hand is None:
+            self.points = self.hand.points
             return self.points
-# ATTEMPT AT SPLITTING
-#         elif hand == 2:
-#             self.points_2 = sum(Card.value for Card in self.player_hand_2)
-#             return self.points_2
-#         elif hand == 3:
-#             self.points_3 = sum(Card.value for Card in self.player_hand_3)
-#             return self.points_3
-#         elif hand == 4:
-#             self.points_4 = sum(Card.value for Card in self.player_hand_4)
-#             return self.points_4
-#         else:
-#             print("hand does not exist")
+        return self.hands[hand - 1].points
 
     def bet(self):
         # Bet from $1-available money
@@ -304,7 +290,7 @@ class Player:
         betting_amount_int = 0
         while (betting_amount.isdigit() is False) or (betting_amount_int not in acceptable_betting_range):
             print(f"Place your bet (you have ${betting_amount_available} available for betting)")
-            betting_amount = input()
+            betting_amount = self.read()
 
             # check if input is valid
             if betting_amount.isdigit() is False:
@@ -317,7 +303,6 @@ class Player:
             else:
                 self.current_bet = int(betting_amount)
                 self.money -= self.current_bet
-                print("\n"*100)
                 break
 
 #         print("\n")
@@ -333,7 +318,7 @@ class Player:
         betting_amount_int = 0
         while (betting_amount.isdigit() is False) or (betting_amount_int not in acceptable_betting_range):
             print(f"Place your insurance bet (you have ${betting_amount_available} available for betting)")
-            betting_amount = input()
+            betting_amount = self.read()
 
             # check if input is valid
             if betting_amount.isdigit() is False:
@@ -348,22 +333,11 @@ class Player:
                 self.money -= self.insurance_bet
                 break     
 
-    def pickup(self, hand: int = 1):
-        if hand == 1:
-            self.player_hand.append(blackjack_deck.draw_card(faceup=True))
-            self.get_points(hand = 1)
-# ATTEMPT AT SPLITTING
-#         elif hand == 2:
-#             self.player_hand_2.append(blackjack_deck.draw_card(faceup=True))
-#             self.get_points(hand = 2)
-#         elif hand == 3:
-#             self.player_hand_3.append(blackjack_deck.draw_card(faceup=True))
-#             self.get_points(hand = 3)
-#         elif hand == 4:
-#             self.player_hand_4.append(blackjack_deck.draw_card(faceup=True))
-#             self.get_points(hand = 4)
-#         else:
-#             print("hand does not exist")
+    def pickup(self, hand: int = None):
+        # hand is the number of a split hand (1-4), the hand being played by default
+        card = self.deck.draw_card(faceup=True)
+        self.hands[self.current_hand if hand is None else hand - 1].deal(card, rank_indexes[card.rank])
+        self.get_points()
 
     def hit(self):
         self.pickup()
@@ -374,9 +348,38 @@ class Player:
         self.current_bet += self.current_bet
         self.hit()
         self.doubled_down = True
-
-#     def split(self):
-#         pass
+        self.hand.doubled = True
+
+    def can_split(self) -> bool:
+        return (
+            len(self.player_hand) == 2 and
+            self.hand.pair and
+            len(self.hands) < self.max_hands and
+            self.money >= self.current_bet and
+            # Split Aces are not split again
+            not (self.hand.split and self.player_hand[0].rank == "Ace")
+        )
+
+    def split(self):
+        # The second card of the pair starts a new hand with the same bet, played after this one
+        self.money -= self.current_bet
+        self.hands.insert(self.current_hand + 1, self.hand.split_off(rank_indexes[self.player_hand[0].rank]))
+        self.pickup()
+        # Split Aces get one card each
+        if self.player_hand[0].rank == "Ace":
+            self.standing = True
+
+    def next_hand(self) -> bool:
+        """Move on to the next split hand and deal its second card. Returns False if there is none."""
+        if self.current_hand + 1 >= len(self.hands):
+            return False
+        self.current_hand += 1
+        self.standing = False
+        self.doubled_down = False
+        self.pickup()
+        if self.player_hand[0].rank == "Ace":
+            self.standing = True
+        return True
 
     def stand(self):
         self.standing = True
@@ -395,11 +398,9 @@ class Player:
         self.losses += 1
 
     def reset_cards(self):
-        self.player_hand = []
-        self.player_hand_2 = []
+        self.hands = [Hand(self.current_bet)]
+        self.current_hand = 0
         self.points = 0
-# ATTEMPT AT SPLITTING
-#         self.points_2 = 0
         self.standing = False
         self.doubled_down = False
 
@@ -409,7 +410,8 @@ class Player:
         self.insurance_bet = 0
         
     def reset_bets(self):
-        self.current_bet = 0
+        for hand in self.hands:
+            hand.bet = 0
         self.insurance_bet = 0
 
     def reset_wins_and_losses(self):
@@ -417,54 +419,33 @@ class Player:
         self.losses = 0
 
     def full_reset(self):
-        Player.__init__(self, name=self.name)
+        Player.__init__(self, name=self.name, deck=self.deck, read=self.read)
 
     def __str__(self) -> str:
-        # Format cards
-        gen_exp = (card for card in self.player_hand)
-        new_list = []
-        for x in gen_exp:
-            new_list.append(Card.ascii_version_of_card(x))
-        lines = [card.splitlines() for card in new_list]
-        zipped_lines = list(zip(*lines))
-        formatted_card_output_side_by_side = ""
-        for index, line in enumerate(list(zipped_lines)):
-            formatted_card_output_side_by_side += " "*(int(width/2 - 12*len(list(zipped_lines)[index])/2)) + "".join(list(zipped_lines)[index]) + "\n"
-       
-    # ATTEMPT AT SPLITTING
-        # Format cards in split deck
-        ## MADE MISTAKE HERE. ADDING SPLITTING WAS A LAST MINUTE IDEA SO 
-        ## DIDN'T REALLY MAKE OBJECTS PROPERLY TO ACCOUNT FOR THIS. SHOULD HAVE MADE A
-        ## HAND CLASS SEPARATE FROM THE PLAYER AND DEALERS. BUT DON'T HAVE TIME DO THIS THIS
-        ## SO I WILL JUST HARD CODE ALL THE POSSIBLE SCENARIOS
-        ## CAN HAVE A MAXIMUM OF 4 SPLIT DECKS
+        return self.render(terminal_width())
 
-# ATTEMPT AT SPLITTING
-#         if len(self.player_hand_2) > 0:
-#             gen_exp_2 = (card for card in self.player_hand_2)
-#             new_list_2 = []
-#             for y in gen_exp_2:
-#                 new_list_2.append(Card.ascii_version_of_card(y))
-#             lines_2 = [card.splitlines() for card in new_list_2]
-#             zipped_lines_2 = list(zip(*lines_2))
-#             formatted_card_output_side_by_side_2 = ""
-#             for index, line in enumerate(list(zipped_lines_2)):
-#                 formatted_card_output_side_by_side_2 += " "*(int(width/2 - 12*len(list(zipped_lines_2)[index])/2)) + "".join(list(zipped_lines_2)[index]) + "\\n"
-#             cards_1_sentence = f"{self.name.title()}'s first hand:"
-#             cards_2_sentence = f"{self.name.title()}'s second hand:"
-#             points_sentence_1 = f"{self.name.title()} has {len(self.player_hand)} cards and {self.get_points()} points in his first hand"
-#             points_sentence_2 = f"{self.name.title()} has {len(self.player_hand_2)} cards and {self.get_points(hand = 2)} points in his second hand"
-
-        # Backslash can't get evaluated in f-string so have to set it in variable
-        nl = '\n'
-        points_sentence = f"{self.name.title()} has {len(self.player_hand)} cards and {self.get_points()} points"
-        if len(self.player_hand) < 1:
-            return f"{' '*int(width/2 - sentence_length/2)}{self.name.title()} has {len(self.player_hand)} cards and {self.get_points()} points"
-# ATTEMPT AT SPLITTING
-#         elif len(self.player_hand_2) > 0:
-#             return f"{' '*int(width/2 - len(cards_1_sentence)/2)}{cards_1_sentence}\n{formatted_card_output_side_by_side}\n{' '*int(width/2 - len(points_sentence_1)/2)}{points_sentence_1}\n\n{' '*int(width/2 - len(cards_2_sentence)/2)}{cards_2_sentence}\n{formatted_card_output_side_by_side_2}\n{' '*int(width/2 - len(points_sentence_2)/2)}{points_sentence_2}"
-        else:
-            return f"{formatted_card_output_side_by_side}\n{' '*int(width/2 - len(points_sentence)/2)}{points_sentence}"
+    def render(self, width: int) -> str:
+        ordinals = self.ordinals
+        rendered_hands = []
+        for number, hand in enumerate(self.hands):
+            # Format cards (frames are cached, an unchanged hand is not drawn again)
+            formatted_card_output_side_by_side = render_cards(tuple(card.glyph for card in hand.cards), width)
+
+            if len(self.hands) == 1:
+                points_sentence = f"{self.name.title()} has {len(hand.cards)} cards and {hand.points} points"
+            else:
+                # Label split hands and point at the one being played
+                cards_sentence = f"{self.name.title()}'s {ordinals[number]} hand:"
+                if number == self.current_hand:
+                    cards_sentence = f"> {cards_sentence} <"
+                points_sentence = f"{self.name.title()} has {len(hand.cards)} cards and {hand.points} points in their {ordinals[number]} hand"
+                formatted_card_output_side_by_side = f"{' '*int(width/2 - len(cards_sentence)/2)}{cards_sentence}\n{formatted_card_output_side_by_side}"
+
+            if len(hand.cards) < 1:
+                rendered_hands.append(f"{' '*int(width/2 - len(points_sentence)/2)}{points_sentence}")
+            else:
+                rendered_hands.append(f"{formatted_card_output_side_by_side}\n{' '*int(width/2 - len(points_sentence)/2)}{points_sentence}")
+        return "\n\n".join(rendered_hands)
 
 
 # ## Create Function With Blackjack Game Logic
@@ -472,7 +453,27 @@ class Player:
 # In[7]:
 
 
-def blackjack():
+def blackjack(policy = None, width: int = None, rng = random, screen: Screen = None, pacer: Pacer = None,
+              read = input, on_round = None, metrics: Metrics = None):
+    # Decisions come from the person at the keyboard unless another policy is given (see policy.py)
+    # Every game owns its deck, dealer and player, and shuffles with its own rng if one is given
+    # The screen only redraws what changed on ANSI terminals (see screen.py)
+    # Pauses between steps of the round are set by the pacer's profile (see pacing.py)
+    # Every answer is read with read(), and on_round(player) is called before each round's bet (see replay.py)
+    # Phases of the round, waiting for answers and pauses are timed in metrics if given (see metrics.py)
+    if metrics is None:
+        metrics = DISABLED
+    read = metrics.timed(phases.INPUT, read)
+    if width is None:
+        width = terminal_width()
+    if policy is None:
+        policy = ConsolePolicy(width, read=read)
+    if pacer is None:
+        pacer = Pacer()
+    if screen is None:
+        screen = Screen()
+    wait = metrics.timed(phases.PAUSE, pacer.wait)
+
     # Set function for asking to play again
     def play_again():
         acceptable_responses = {"yes": "yes",
@@ -483,7 +484,7 @@ def blackjack():
         response = ""
         while response.lower() not in acceptable_responses.keys():
             print("Do you want to play again?")
-            response = input().lower()
+            response = read().lower()
 
             # Check if response is valid
             if response.lower() not in acceptable_responses.keys():
@@ -501,100 +502,40 @@ For No, type: No, no, N, or n
             return "no"
 
     def hit_or_stand():
-        nonlocal player # need this for player to be in the scope of this function for some reason
-        options = ["Hit", "Stand"]
-        acceptable_responses = {
-            "hit": "hit",
-            "h": "hit",
-            "y": "hit",
-            "1": "hit",
-            "stand": "stand",
-            "s": "stand",
-            "n": "stand",
-            "2": "stand"
-        }
-        extra_aid = []
-        nl = "\n"
-        
+        legal_actions = ["hit", "stand"]
+
         # Check for doubling down
         if (
             player.money >= player.current_bet and 
             len(player.player_hand) == 2
         ):
-            options.append("Double down")
-            acceptable_responses.update(
-                {
-                    "double down": "double_down",
-                    "doubledown": "double_down",
-                    "dd": "double_down",
-                    "d": "double_down",
-                    "3": "double_down"
-                }
-            )
-            extra_aid.append("For Doubling down, type: double down, doubledown, dd, d, or 3")
-        
+            legal_actions.append("double_down")
+
         # Check for splitting hand
-        if (
-            len(player.player_hand) == 2 and
-            player.player_hand[0].rank == player.player_hand[1].rank
-        ):
-            options.append("Split")
-            acceptable_responses.update(
-                {
-                    "split": "split",
-                    "ss": "split",
-                    "4": "split"
-                }
-            )
-            extra_aid.append("For Splitting, type: split, ss, or 4")
-        
+        if player.can_split():
+            legal_actions.append("split")
+
         # Check if placing insuarance bet
         if (
             player.money > 0 and
             player.current_bet > 1 and
             player.insurance_bet == 0 and
+            len(player.hands) == 1 and
             len(player.player_hand) == 2 and 
             dealer.dealer_hand[1].rank == "Ace"
         ):
-            insurance_bet_warning = f"""{"Dealer is showing an Ace. Would you like to place an insurance bet?".center(width)}
-{"(Payout is 2:1 on the insurance line and up to half of your current bet can be wagered)".center(width)}
-            """
-            print(insurance_bet_warning)
-            options.append("place an Insurance Bet")
-            acceptable_responses.update(
-                {
-                    "insurance bet": "insurance",
-                    "insurancebet": "insurance",
-                    "insurance": "insurance",
-                    "bet": "insurance",
-                    "ib": "insurance",
-                    "i": "insurance",
-                    "b": "insurance",
-                    "5": "insurance",
-                }
-            )
-            extra_aid.append("For Placing an Insurance Bet, type: insurance bet, insurancebet, insurance, bet, ib, i, b, or 5")
-        
-
-        question = f"{', '.join(list(option for option in options[:-1]))} or {options[-1]}?".lstrip(",")
-        response = ""
-        while response.lower() not in acceptable_responses.keys():
-            print(f"{question.center(width)}")
-            response = input().lower()
-
-            # Check if response is valid
-            if response.lower() not in acceptable_responses.keys():
-                print(f"""
-{"Please give a valid response.".center(width)}
-{"For Hitting, type: hit, h, y, or 1".center(width)}
-{"For Standing, type: stand, s, n, or 2".center(width)}
-{nl.join(list(aid.center(width) for aid in extra_aid))}
-                                """)
-            else:
-                break
-
-        # This runs either player.hit() or player.stand()
-        eval("player." + acceptable_responses[response] + "()")
+            legal_actions.append("insurance")
+
+        observation = Observation(tuple(player.player_hand),
+                                  player.points,
+                                  player.hand_total.is_soft,
+                                  player.hand_total.pair,
+                                  dealer.dealer_hand[1].value,
+                                  tuple(legal_actions),
+                                  player.current_bet)
+
+        # This runs player.hit(), player.stand(), ... for the chosen action
+        player_actions[policy.decide(observation)]()
             
         
     # Set function to display complex print statements
@@ -617,60 +558,33 @@ For No, type: No, no, N, or n
             """
         if option == "show_table":
             return f"""
-{'-' * os.get_terminal_size()[0]}
-{dealer}
+{'-' * width}
+{dealer.render(width)}
 
 
 
-{player} 
-{'-' * os.get_terminal_size()[0]}
+{player.render(width)} 
+{'-' * width}
             """
 
-    def ace_check_player():
-        index_list = []
-        for index, card in enumerate(player.player_hand):
-            if card.value == 11:
-                index_list.append(index)
-
-        while player.points > 21:
-            for index in index_list:
-                player.player_hand[index].value = 1
-                player.get_points()
-                # check if value of hand is below 21 (check here allows some aces to be 11)
-                if player.points > 21:
-                    continue
-                else:
-                    break
-
-            if player.points > 21:
-                return "bust"
-                break
+    # Draw the stats (unless stats is False) and the table
+    def draw_table(stats: bool = True):
+        with metrics.time(phases.RENDER):
+            if stats:
+                screen.draw(output("stats", bet = True), output("show_table"))
             else:
-                return player.points
-                break
+                screen.draw(output("show_table"))
 
-    def ace_check_dealer():
-        index_list = []
-        for index, card in enumerate(dealer.dealer_hand):
-            if card.value == 11:
-                index_list.append(index)
-
-        while dealer.points > 21:
-            for index in index_list:
-                dealer.dealer_hand[index].value = 1
-                dealer.get_points()
-                # check if value of hand is below 21 (check here allows some aces to be 11)
-                if dealer.points > 21:
-                    continue
-                else:
-                    break
+    # Aces are already softened by the hand scores, so these only need to report a bust
+    def ace_check_player():
+        if player.hand_total.bust:
+            return "bust"
+        return player.get_points()
 
-            if dealer.points > 21:
-                return "bust"
-                break
-            else:
-                return dealer.points
-                break
+    def ace_check_dealer():
+        if dealer.hand_total.bust:
+            return "bust"
+        return dealer.get_points()
 
     def check_if_beat_dealer():
        
@@ -685,8 +599,7 @@ For No, type: No, no, N, or n
         #(you already checked for if you busted before standing so don't have to take those scenarios into account)
         if (
             dealer.points > 21 and 
-            player.points == 21 and 
-            len(player.player_hand) == 2
+            player.hand.blackjack
         ):
             print(f"BLACKJACK! {player.name.title()} wins!".center(width))
             print(f"Payout is 2.5x your initial bet. You recieve ${int(2.5 * player.current_bet)}.".center(width))
@@ -720,8 +633,7 @@ For No, type: No, no, N, or n
 
             elif (
                 player.points > dealer.points and 
-                player.points == 21 and 
-                len(player.player_hand) == 2
+                player.hand.blackjack
             ):
                 print(f"BLACKJACK! {player.name.title()} wins!".center(width))
                 print(f"Payout is 2.5x your initial bet. You recieve ${int(2.5 * player.current_bet)}.".center(width))
@@ -760,13 +672,13 @@ For No, type: No, no, N, or n
                     print(f"You lose ${player.current_bet + player.insurance_bet}.".center(width))
                     player.lose()
 
-    print("\n"*100)
+    screen.reset()
     
     # Set player name for player instance
     player_name = ""
     while player_name == "":
         print("What is your name?")
-        player_name = input()
+        player_name = read()
 
         # check if name is valid
         if player_name == "":
@@ -775,11 +687,15 @@ For No, type: No, no, N, or n
             break
 
     # Create instances
-    ## Need to have instantiated deck outside of blackjack function for all the methods to act upon in (scope)
-    blackjack_deck.reset()
-    blackjack_deck.shuffle()
-    dealer = Dealer()
-    player = Player(name=player_name)
+    deck = Deck()
+    deck.shuffle(rng)
+    dealer = Dealer(deck)
+    player = Player(name=player_name, deck=deck, read=read)
+    player_actions = {"hit": player.hit,
+                      "stand": player.stand,
+                      "double_down": player.double_down,
+                      "split": player.split,
+                      "insurance": player.insurance}
 
     # Set toggle variable (turn game off when round is done)
     game_on = True
@@ -796,16 +712,22 @@ For No, type: No, no, N, or n
             game_on = False
             break
 
+        if on_round is not None:
+            on_round(player)
+
         # Initiate betting
-        player.bet()
+        metrics.count("rounds")
+        with metrics.time(phases.BET):
+            player.bet()
+        screen.clear()
 
         # Initiate dealing (player gets dealt first)
-        player.pickup()
-        dealer.pickup()
-        player.pickup()
-        dealer.pickup()
-        player.pickup(hand = 2)
-        player.pickup(hand = 2)
+        with metrics.time(phases.DEAL):
+            player.pickup()
+            dealer.pickup()
+            player.pickup()
+            dealer.pickup()
+        wait(DEAL)
 
 
         # variable for breaking out of loop
@@ -814,61 +736,74 @@ For No, type: No, no, N, or n
         
         
         
-        # Inner while loop executed until stand is said or bust
-        # Round ends when player stands, doubles down, or busts
-        while player.standing == False:
-
-            # check if player has bust
-            if player.points > 21:
-                # check if player has Ace(s) in their hand and reduce their value
-                checked = ace_check_player()  # This function does that
-
-                if checked == "bust":
-                    print(output("stats", bet = True))
-                    print(output("show_table"))
-                    time.sleep(2)
-                    print("BUST!".center(width))
-                    print(f"You lose ${player.current_bet + player.insurance_bet}.".center(width))
-                    time.sleep(2)
-                    player.lose()
-                    player.reset_bets()
-                    
-                    # check if money left
-                    if player.money <= 0:
-                        print("Game is over! You are bankrupt".center(width))
-                        bankrupt = True
+        # Play each of the player's hands in turn (splitting adds hands behind the current one)
+        while True:
+
+            # Inner while loop executed until stand is said or bust
+            # Hand ends when player stands, doubles down, or busts
+            while player.standing == False:
+
+                # check if player has bust
+                if player.points > 21:
+                    # check if player has Ace(s) in their hand and reduce their value
+                    checked = ace_check_player()  # This function does that
+
+                    if checked == "bust":
+                        # Insurance belongs to the first hand and is lost with it, a later split hand leaves it be
+                        first_hand = player.current_hand == 0
+                        draw_table()
+                        wait(BUST)
+                        print("BUST!".center(width))
+                        print(f"You lose ${player.current_bet + (player.insurance_bet if first_hand else 0)}.".center(width))
+                        wait(SETTLE)
+                        player.lose()
+                        player.hand.settled = True
+                        metrics.count("hands")
+                        metrics.count("busts")
+                        if first_hand:
+                            player.insurance_bet = 0
                         break
 
-                    print(output("stats"))
+                # check if doubled_down
+                if player.doubled_down == True:
+                    screen.clear()
+                    break
 
-                    y_or_n = play_again()
+                # Print out information
+                draw_table()
 
-                    if y_or_n == "yes":
-                        dealer.reset()
-                        player.reset_cards()
-                        blackjack_deck.reset()
-                        blackjack_deck.shuffle()
-                        print("\n"*100)
-                        break
-                    elif y_or_n == "no":
-                        player.leave_table()
-                        break
-                        
-            # check if doubled_down
-            if player.doubled_down == True:
-                print("\n"*100)
-                break
+                # Game logic
+                with metrics.time(phases.DECISIONS):
+                    hit_or_stand()
+                ace_check_player()
+                screen.clear()
 
-            # Print out information
-            print(output("stats", bet = True))
-            print(output("show_table"))
+            # Move on to the next split hand, if there is one
+            if player.next_hand() == False:
+                break
+            screen.clear()
 
-            # Game logic
-            hit_or_stand()
-            ace_check_player()
-            print("\n"*100)
+        # Code in this indentation gets executed if every hand has bust
+        if all(hand.settled for hand in player.hands):
+            player.reset_bets()
 
-        # Code in this indentation gets executed if player is standing
+            # check if money left
+            if player.money <= 0:
+                print("Game is over! You are bankrupt".center(width))
+                bankrupt = True
+            else:
+                print(output("stats"))
+
+                y_or_n = play_again()
+
+                if y_or_n == "yes":
+                    dealer.reset()
+                    player.reset_cards()
+                    deck.reset()
+                    deck.shuffle(rng)
+                    screen.reset()
+                elif y_or_n == "no":
+                    player.leave_table()
         
         # break out of outer loop
         if bankrupt == True:
@@ -876,43 +811,54 @@ For No, type: No, no, N, or n
         if y_or_n == "yes" or y_or_n == "no":
             continue
 
+        # Code in this indentation gets executed if at least one hand is standing
         
-        print(output("stats", bet = True))
-        print(output("show_table"))
+        draw_table()
 
         # Dealer checks his card
         print("Dealer checks his cards...".center(width))
-        time.sleep(3)
-        dealer.show_cards()
-        ace_check_dealer()
-        print("\n"*100)
-        print(output("stats", bet = True))
-        print(output("show_table"))
-        time.sleep(3)
+        wait(REVEAL)
+        with metrics.time(phases.DEALER):
+            dealer.show_cards()
+            ace_check_dealer()
+        screen.clear()
+        draw_table()
+        wait(REVEAL)
         first_loop = True
         while dealer.points <= 16:
             if first_loop == False:
-                print("\n"*100)
-                print(output("stats", bet = True))
-                print(output("show_table"))
-                time.sleep(2)
+                screen.clear()
+                draw_table()
+                wait(DEALER_DRAW)
             first_loop = False
             print("Dealer picks up a card".center(width))
-            dealer.pickup()
-            ace_check_dealer()
-            time.sleep(1.5)
-        
-        print("\n"*100)
-        print(output("stats", bet = True))
-        print(output("show_table"))
-        time.sleep(1)
-        print("\n"*100)
-        print(output("show_table"))
-        check_if_beat_dealer()
+            with metrics.time(phases.DEALER):
+                dealer.pickup()
+                ace_check_dealer()
+            wait(DEALER_CARD)
         
-        ### HERE WOULD BE WHERE YOU WOULD HAVE TO PUT AN IF CONDITIONAL TO CHECK IF THE PLAYER STILL HAS OTHER HANDS ###
+        screen.clear()
+        draw_table()
+        wait(DEALER_DONE)
+        screen.clear()
+        draw_table(stats = False)
+
+        # Settle every hand that did not bust
+        for number, hand in enumerate(player.hands):
+            if hand.settled:
+                continue
+            player.current_hand = number
+            player.get_points()
+            if len(player.hands) > 1:
+                print(f"{player.name.title()}'s {player.ordinals[number]} hand:".center(width))
+            with metrics.time(phases.SETTLE):
+                check_if_beat_dealer()
+            hand.settled = True
+            metrics.count("hands")
+            # Insurance belongs to the first hand
+            player.insurance_bet = 0
         
-        time.sleep(2)
+        wait(SETTLE)
         player.reset_bets()
         
         # check if money left
@@ -927,11 +873,13 @@ For No, type: No, no, N, or n
         if y_or_n == "yes":
             dealer.reset()
             player.reset_cards()
-            blackjack_deck.reset()
-            blackjack_deck.shuffle()
-            print("\n"*100)
+            deck.reset()
+            deck.shuffle(rng)
+            screen.reset()
         elif y_or_n == "no":
             player.leave_table()
+
+    screen.close()
         
 
 
@@ -940,7 +888,31 @@ For No, type: No, no, N, or n
 # In[ ]:
 
 
-blackjack()
+if __name__ == "__main__":
+    import argparse
+
+    from pacing import PROFILES
+    from profiling import add_arguments, run
+
+    parser = argparse.ArgumentParser(description="Play blackjack in the terminal")
+    parser.add_argument("--pace", choices=list(PROFILES), default="classic", help="pauses between steps of a round")
+    parser.add_argument("--skip", action="store_true", help="press a key to skip a pause")
+    parser.add_argument("--metrics", default=None,
+                        help="time the phases of every round, print a summary and write them to this file (Prometheus text)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = Metrics() if args.metrics else None
+    screen = Screen()
+    try:
+        run(lambda: blackjack(screen=screen, pacer=Pacer(args.pace, skip_on_key=args.skip), metrics=metrics), args)
+    finally:
+        # Also when the game is left with Ctrl-C, or the terminal keeps scrolling only the prompt rows
+        screen.close()
+        if metrics is not None:
+            from metrics import write_prometheus
+            print(metrics.summary())
+            write_prometheus(args.metrics, [metrics])
 
 
 # In[ ]:
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Compact card encoding for engine code.
+# A card is a small int 0-51: suit index * 13 + rank index, in the same order
+# Deck.__init__ builds its Card objects. Everything about a card is a lookup in
+# a table built once here, so dealing and scoring never touch attributes.
+# Card objects are only needed for display.
+
+from array import array
+
+
+# Unchanging values (same as blackjack.py)
+suits = ['Spades', 'Diamonds', 'Hearts', 'Clubs']
+ranks = ["Ace", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Jack", "Queen", "King"]
+rank_values = [11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10]
+
+ACE = 0
+DECK_SIZE = len(suits) * len(ranks)
+
+# Per card code lookups
+RANK = array('B', [code % 13 for code in range(DECK_SIZE)])
+SUIT = array('B', [code // 13 for code in range(DECK_SIZE)])
+VALUE = array('B', [rank_values[code % 13] for code in range(DECK_SIZE)])
+# Hi-Lo counting value: +1 for 2-6, 0 for 7-9, -1 for tens and Aces
+HI_LO = array('b', [1 if 2 <= rank_values[code % 13] <= 6 else 0 if rank_values[code % 13] <= 9 else -1
+                    for code in range(DECK_SIZE)])
+
+
+def encode(suit: str, rank: str) -> int:
+    return suits.index(suit) * 13 + ranks.index(rank)
+
+
+def rank_name(code: int) -> str:
+    return ranks[RANK[code]]
+
+
+def suit_name(code: int) -> str:
+    return suits[SUIT[code]]
+
+
+def name(code: int) -> str:
+    return f"{ranks[RANK[code]]} of {suits[SUIT[code]]}"
+
+
+def new_deck() -> array:
+    # One unshuffled deck as a byte buffer
+    return array('B', range(DECK_SIZE))
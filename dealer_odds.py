@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Exact probabilities of how the dealer's hand ends, for a given upcard and the
+# cards left in the shoe, following the same rule as blackjack(): the dealer
+# draws while on 16 or less and stands on everything else (soft 17 included).
+# There is no peek, so a dealer blackjack is one of the possible endings.
+#
+# A shoe composition is a 10 byte key: how many Aces, Twos, ..., Nines and
+# ten-valued cards are left. Every partial dealer hand reached while drawing
+# is memoized on (composition, hand), with LRU eviction, so after the first
+# call most lookups are cache hits instead of Monte Carlo rollouts.
+
+from functools import lru_cache
+
+import cards
+
+
+# Index of each possible ending in the returned distributions
+OUTCOMES = ("17", "18", "19", "20", "21", "blackjack", "bust")
+BLACKJACK_INDEX = OUTCOMES.index("blackjack")
+BUST_INDEX = OUTCOMES.index("bust")
+
+# Value classes used in compositions: index 0 is Ace, 1-8 are Two-Nine, 9 is every ten-valued card
+N_CLASSES = 10
+CLASS_VALUES = (11, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+CLASS_OF_RANK = tuple(min(rank, 9) for rank in range(len(cards.ranks)))
+
+CACHE_SIZE = 1 << 18
+
+
+def full_shoe(decks: int = 1) -> bytes:
+    return bytes([4 * decks] * 9 + [16 * decks])
+
+
+def composition(card_codes) -> bytes:
+    """Composition key for an iterable of card codes (e.g. shoe.cards[shoe.position:])."""
+    counts = [0] * N_CLASSES
+    for code in card_codes:
+        counts[CLASS_OF_RANK[cards.RANK[code]]] += 1
+    return bytes(counts)
+
+
+def remove(counts: bytes, value_class: int) -> bytes:
+    if counts[value_class] == 0:
+        raise ValueError(f"No {CLASS_VALUES[value_class]}-valued cards left in composition {list(counts)}")
+    return counts[:value_class] + bytes((counts[value_class] - 1,)) + counts[value_class + 1:]
+
+
+def _ending(index: int) -> tuple:
+    distribution = [0.0] * len(OUTCOMES)
+    distribution[index] = 1.0
+    return tuple(distribution)
+
+
+ENDINGS = {points: _ending(points - 17) for points in range(17, 22)}
+BLACKJACK = _ending(BLACKJACK_INDEX)
+BUST = _ending(BUST_INDEX)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _finish(counts: bytes, hard: int, ace: bool, n_cards: int) -> tuple:
+    # hard counts every Ace as 1, one Ace is worth 11 when that does not bust
+    if hard > 21:
+        return BUST
+    points = hard + 10 if ace and hard <= 11 else hard
+    if points > 16:
+        if n_cards == 2 and points == 21:
+            return BLACKJACK
+        return ENDINGS[points]
+
+    total = sum(counts)
+    if total == 0:
+        raise ValueError("The shoe ran out of cards while the dealer was drawing")
+    distribution = [0.0] * len(OUTCOMES)
+    for value_class, count in enumerate(counts):
+        if count == 0:
+            continue
+        probability = count / total
+        value = CLASS_VALUES[value_class]
+        ending = _finish(remove(counts, value_class),
+                         hard + (1 if value == 11 else value),
+                         ace or value == 11,
+                         n_cards + 1)
+        for index, p in enumerate(ending):
+            distribution[index] += probability * p
+    return tuple(distribution)
+
+
+def dealer_distribution(upcard: int, counts: bytes) -> tuple:
+    """
+    Probabilities of the dealer finishing on 17, 18, 19, 20, 21, blackjack or bust (see OUTCOMES).
+
+    :param upcard: value class of the dealer's face up card (0 for an Ace, 9 for ten-valued)
+    :param counts: composition of the cards still in the shoe, upcard already removed
+    """
+    value = CLASS_VALUES[upcard]
+    return _finish(counts, 1 if value == 11 else value, value == 11, 1)
+
+
+def cache_info():
+    return _finish.cache_info()
+
+
+def cache_clear():
+    _finish.cache_clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exact dealer final-total probabilities per upcard")
+    parser.add_argument("--decks", type=int, default=1)
+    args = parser.parse_args()
+
+    shoe = full_shoe(args.decks)
+    print(f"{'upcard':>8}" + "".join(f"{outcome:>10}" for outcome in OUTCOMES))
+    for upcard in list(range(1, N_CLASSES)) + [0]:
+        distribution = dealer_distribution(upcard, remove(shoe, upcard))
+        name = "A" if upcard == 0 else str(CLASS_VALUES[upcard])
+        print(f"{name:>8}" + "".join(f"{p:>10.4f}" for p in distribution))
+    print(cache_info())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Headless version of the round played by blackjack() in blackjack.py.
+# Same rules (deal order, ace softening, dealer draws to 17, payouts), but no
+# input(), no printing and no time.sleep, so rounds can be simulated in bulk.
+
+import random
+from dataclasses import dataclass, field
+
+from cards import ACE, RANK, VALUE
+from hand import Hand
+from metrics import DEAL, DEALER, DECISIONS, SETTLE, Metrics
+from policy import DOUBLE_DOWN, HIT, INSURANCE, SPLIT, STAND, Observation
+from scoring import HandTotal
+from shoe import Shoe
+
+
+@dataclass(frozen=True)
+class Rules:
+    # A player can split into at most this many hands
+    max_hands: int = 4
+    double_after_split: bool = True
+    # Split Aces get one card each (and are never split again) unless this is set
+    hit_split_aces: bool = False
+
+
+DEFAULT_RULES = Rules()
+
+MAX_SEATS = 7
+
+# Outcome of a settled hand, in the order of simulate.py's outcome codes
+OUTCOMES = ("bust", "lose", "tie", "win", "blackjack")
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+
+@dataclass
+class RoundResult:
+    # Every hand the player ended up with (more than one after splitting), settled
+    hands: list
+    dealer_cards: list
+    dealer_points: int
+    insurance_bet: int
+    # Insurance money handed back at settlement
+    insurance_payout: int = 0
+    actions: list = field(default_factory=list)
+    # True if the shoe was reshuffled before this round (or its discards during it)
+    reshuffled: bool = False
+
+    @property
+    def bet(self) -> int:
+        return sum(hand.bet for hand in self.hands)
+
+    @property
+    def payout(self) -> int:
+        # Money handed back to the player at settlement (stakes included), as in check_if_beat_dealer()
+        return sum(hand.payout for hand in self.hands) + self.insurance_payout
+
+    @property
+    def net(self) -> int:
+        return self.payout - self.bet - self.insurance_bet
+
+    @property
+    def outcome(self) -> str:
+        # Outcome of the hand, or "split" when the player split it into several
+        return self.hands[0].outcome if len(self.hands) == 1 else "split"
+
+    @property
+    def player_cards(self) -> list:
+        return self.hands[0].cards
+
+    @property
+    def player_points(self) -> int:
+        return self.hands[0].points
+
+
+def hand_total(cards) -> HandTotal:
+    total = HandTotal()
+    for card in cards:
+        total.add(RANK[card])
+    return total
+
+
+def hand_points(cards) -> int:
+    return hand_total(cards).points
+
+
+def split_aces_done(hand: Hand, rules: Rules) -> bool:
+    # Split Aces take one card and stand
+    return hand.split and RANK[hand.cards[0]] == ACE and not rules.hit_split_aces
+
+
+def legal_actions(hand: Hand, hands: int, dealer_upcard, insurance_bet: int, rules: Rules = DEFAULT_RULES) -> tuple:
+    actions = [HIT, STAND]
+    two_cards = len(hand.cards) == 2
+    if two_cards and (not hand.split or rules.double_after_split):
+        actions.append(DOUBLE_DOWN)
+    if (
+        two_cards and
+        hand.pair and
+        hands < rules.max_hands and
+        not (hand.split and RANK[hand.cards[0]] == ACE)
+    ):
+        actions.append(SPLIT)
+    if (
+        hand.bet > 1 and
+        insurance_bet == 0 and
+        two_cards and
+        hands == 1 and
+        RANK[dealer_upcard] == ACE
+    ):
+        actions.append(INSURANCE)
+    return tuple(actions)
+
+
+def settle(player, dealer: HandTotal, bet: int, insurance_bet: int = 0) -> tuple:
+    """
+    Return (outcome, payout, insurance_payout) for a hand that did not bust, following check_if_beat_dealer().
+    insurance_bet is only given for the hand the insurance was taken on.
+    """
+    player_points = player.points
+    dealer_points = dealer.points
+
+    # Scenarios for if dealer goes over 21
+    if dealer_points > 21:
+        if player.blackjack:
+            return "blackjack", int(2.5 * bet), 0
+        return "win", 2 * bet, 0
+
+    # Scenarios for if the dealer doesn't go over 21
+    if player_points == dealer_points:
+        return "tie", bet, 0
+    if player_points > dealer_points and player.blackjack:
+        return "blackjack", int(2.5 * bet), 0
+    if player_points > dealer_points:
+        return "win", 2 * bet, 0
+
+    # Dealer wins, insurance pays 2x if the dealer had blackjack
+    if insurance_bet > 0 and dealer.blackjack:
+        return "lose", 0, 2 * insurance_bet
+    return "lose", 0, 0
+
+
+def _play_hands(seat: int, hands: list, draw, dealer_upcard, rules: Rules):
+    # Play a seat's hand (and every hand split into the same list) until each stands, doubles down or busts
+    # Yields (seat, observation) for every decision and is sent the action back. Returns (insurance_bet, actions)
+    insurance_bet = 0
+    actions = []
+    upcard_value = VALUE[dealer_upcard]
+
+    # Splits queue up behind the hand being played
+    index = 0
+    while index < len(hands):
+        hand = hands[index]
+        index += 1
+        # A split hand gets its second card when its turn comes
+        if len(hand.cards) == 1:
+            card = draw()
+            hand.deal(card, RANK[card])
+            if split_aces_done(hand, rules):
+                continue
+
+        while not hand.bust:
+            legal = legal_actions(hand, len(hands), dealer_upcard, insurance_bet, rules)
+            action = yield seat, Observation(tuple(hand.cards), hand.points, hand.is_soft, hand.pair,
+                                             upcard_value, legal, hand.bet)
+            if action not in legal:
+                raise ValueError(f"Illegal action {action!r}, expected one of {legal}")
+            actions.append(action)
+
+            if action == STAND:
+                break
+            elif action == HIT:
+                card = draw()
+                hand.deal(card, RANK[card])
+            elif action == DOUBLE_DOWN:
+                hand.bet += hand.bet
+                hand.doubled = True
+                card = draw()
+                hand.deal(card, RANK[card])
+                break
+            elif action == SPLIT:
+                hands.insert(index, hand.split_off(RANK[hand.cards[0]]))
+                card = draw()
+                hand.deal(card, RANK[card])
+                if split_aces_done(hand, rules):
+                    break
+            elif action == INSURANCE:
+                # Up to half of the current bet can be wagered, the engine always takes the maximum
+                insurance_bet = int(hand.bet / 2)
+
+    for hand in hands:
+        if hand.bust:
+            hand.settle("bust", 0)
+    return insurance_bet, actions
+
+
+class TableRound:
+    """
+    One round at a table of up to MAX_SEATS seats sharing one shoe and one dealer.
+    Cards are dealt around the table in seat order, every seat plays its hands in
+    turn, then the dealer draws once and is settled against every seat.
+
+    play() is a generator, so the caller decides how each decision is made
+    (play_table_round asks policies, server.py awaits its clients). While it
+    runs, hands and dealer_cards show the table as it stands.
+    """
+
+    def __init__(self, bets, shoe: Shoe = None, rng: random.Random = None, rules: Rules = DEFAULT_RULES,
+                 metrics: Metrics = None):
+        """
+        :param bets: initial bet of every seat in dealing order
+        :param shoe: shoe to deal from, reshuffled before the round when its cut card is out; a new one if None
+        :param rng: random.Random for the new shoe
+        :param rules: splitting and doubling rules
+        :param metrics: times the deal, the dealer and the settlement if given and enabled (see metrics.py)
+        """
+        if not 1 <= len(bets) <= MAX_SEATS:
+            raise ValueError(f"A table has between 1 and {MAX_SEATS} seats, not {len(bets)}")
+        self.shoe = shoe if shoe is not None else Shoe(rng)
+        self.rules = rules
+        # Hands of every seat, a seat has more than one after splitting
+        self.hands = [[Hand(bet)] for bet in bets]
+        self.dealer_cards = []
+        self.reshuffled = False
+        self.metrics = metrics if metrics is not None and metrics.enabled else None
+
+    def play(self):
+        """Yield (seat, observation) for every decision, to be sent the action. Returns a RoundResult per seat."""
+        shuffles = self.shoe.shuffles
+        self.shoe.start_round()
+        draw = self.shoe.draw
+        rules = self.rules
+        dealer_cards = self.dealer_cards
+        metrics = self.metrics
+        if metrics is not None:
+            start = metrics.clock()
+
+        # Initiate dealing (one card to every seat, dealer's hole card, second card to every seat, dealer's upcard)
+        for hands in self.hands:
+            card = draw()
+            hands[0].deal(card, RANK[card])
+        dealer_cards.append(draw())
+        for hands in self.hands:
+            card = draw()
+            hands[0].deal(card, RANK[card])
+        dealer_cards.append(draw())
+        dealer = HandTotal()
+        for card in dealer_cards:
+            dealer.add(RANK[card])
+        dealer_upcard = dealer_cards[1]
+        if metrics is not None:
+            metrics.lap(DEAL, start)
+
+        played = []
+        for seat, hands in enumerate(self.hands):
+            played.append((yield from _play_hands(seat, hands, draw, dealer_upcard, rules)))
+
+        if metrics is not None:
+            start = metrics.clock()
+
+        # Dealer reveals and draws while on 16 or less, if any hand at the table is still in play
+        if not all(hand.settled for hands in self.hands for hand in hands):
+            while dealer.points <= 16:
+                card = draw()
+                dealer_cards.append(card)
+                dealer.add(RANK[card])
+        if metrics is not None:
+            start = metrics.lap(DEALER, start)
+        self.reshuffled = self.shoe.shuffles != shuffles
+
+        results = []
+        for hands, (insurance_bet, actions) in zip(self.hands, played):
+            insurance_payout = 0
+            for number, hand in enumerate(hands):
+                if hand.settled:
+                    continue
+                # Insurance belongs to the original hand, only it settles the insurance bet
+                outcome, payout, paid = settle(hand, dealer, hand.bet, insurance_bet if number == 0 else 0)
+                if number == 0:
+                    insurance_payout = paid
+                hand.settle(outcome, payout)
+            results.append(RoundResult(hands, dealer_cards, dealer.points, insurance_bet, insurance_payout,
+                                       actions, self.reshuffled))
+        if metrics is not None:
+            metrics.lap(SETTLE, start)
+        return results
+
+
+def play_table_round(seats, shoe: Shoe = None, rng: random.Random = None,
+                     rules: Rules = DEFAULT_RULES, metrics: Metrics = None) -> list:
+    """
+    Play one round at a table, asking each seat's policy for its decisions.
+
+    :param seats: (policy, bet) for every seat in dealing order
+    :param metrics: times the phases of the round if given (see metrics.py)
+    :return: a RoundResult per seat, in seat order
+    """
+    steps = TableRound([bet for _, bet in seats], shoe, rng, rules, metrics).play()
+    if metrics is not None:
+        decide = [metrics.timed(DECISIONS, policy.decide) for policy, _ in seats]
+    else:
+        decide = [policy.decide for policy, _ in seats]
+    try:
+        seat, observation = next(steps)
+        while True:
+            seat, observation = steps.send(decide[seat](observation))
+    except StopIteration as stop:
+        return stop.value
+
+
+def play_round(policy, bet: int = 1, shoe: Shoe = None, rng: random.Random = None,
+               rules: Rules = DEFAULT_RULES) -> RoundResult:
+    """
+    Play one full round for a single seat without any I/O.
+
+    :param policy: object with decide(observation) -> action (see policy.py)
+    :param bet: initial bet for the round
+    :param shoe: shoe to deal from, reshuffled before the round when its cut card is out; a new one if None
+    :param rng: random.Random for the new shoe
+    :param rules: splitting and doubling rules
+    """
+    return play_table_round([(policy, bet)], shoe, rng, rules)[0]
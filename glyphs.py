@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ASCII card art, drawn once.
+# GLYPHS holds the nine rows of every face (indexed by card code, see cards.py)
+# followed by the back of a card at BACK, so drawing a card is a lookup instead
+# of rebuilding the conversion dicts and formatting nine lines every time.
+# render_cards() lays a hand out side by side one row at a time, and remembers
+# the frames it has already composed: a hand that did not change between two
+# redraws is not rebuilt.
+
+from functools import lru_cache
+
+from cards import DECK_SIZE, RANK, SUIT
+
+
+# Rank as printed in the corners ("King" doesn't fit, so it becomes "K"), and suit icons
+rank_symbols = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+suits_symbols = ['♠', '♦', '♥', '♣']
+
+BACK = DECK_SIZE
+CARD_HEIGHT = 9
+
+
+def _face(code: int) -> tuple:
+    rank = rank_symbols[RANK[code]]
+    # ten is the only rank that is 2 chars long, the others are padded with a space
+    space = '' if len(rank) == 2 else ' '
+    suit = suits_symbols[SUIT[code]]
+    return ('┌─────────┐',
+            '│{}{}       │'.format(rank, space),
+            '│         │',
+            '│         │',
+            '│    {}    │'.format(suit),
+            '│         │',
+            '│         │',
+            '│       {}{}│'.format(space, rank),
+            '└─────────┘')
+
+
+GLYPHS = tuple(_face(code) for code in range(DECK_SIZE)) + (('┌─────────┐',) + ('│░░░░░░░░░│',) * 7 + ('└─────────┘',),)
+
+
+def card_art(code: int) -> str:
+    # One card (or the back, for BACK) as a multi-line string
+    return '\n'.join(GLYPHS[code])
+
+
+@lru_cache(maxsize=1024)
+def render_cards(codes: tuple, width: int) -> str:
+    """
+    Cards side by side, each row centred on width and ending with a newline.
+
+    :param codes: card codes in the hand, BACK for a face down card
+    :param width: width of the terminal
+    """
+    if not codes:
+        return ""
+    # Same centring as the original renderers (12 columns per card)
+    indent = " " * int(width / 2 - 12 * len(codes) / 2)
+    glyphs = [GLYPHS[code] for code in codes]
+    return "".join(indent + "".join(glyph[row] for glyph in glyphs) + "\n" for row in range(CARD_HEIGHT))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# One hand of a player: its cards, its bet and where it stands in the round.
+# A player starts a round with one Hand and every split adds another (up to
+# four), instead of the hard-coded player_hand_2..4 of the splitting attempt.
+# Hand is a HandTotal, so its score is kept up to date one card at a time.
+
+from scoring import HandTotal
+
+
+class Hand(HandTotal):
+    __slots__ = ("cards", "bet", "doubled", "settled", "split", "outcome", "payout")
+
+    def __init__(self, bet: int = 0, split: bool = False):
+        HandTotal.__init__(self)
+        # Card codes in the engine, Card objects in the console game
+        self.cards = []
+        self.bet = bet
+        self.doubled = False
+        self.settled = False
+        # True if this hand came from splitting a pair
+        self.split = split
+        # Filled in at settlement: "blackjack", "win", "tie", "lose" or "bust", and the money handed back
+        self.outcome = None
+        self.payout = 0
+
+    def deal(self, card, rank: int):
+        # rank is the index into ranks (0 is Ace), used for scoring
+        self.cards.append(card)
+        self.add(rank)
+
+    @property
+    def blackjack(self) -> bool:
+        # 21 with two cards only counts as blackjack on an unsplit hand
+        return not self.split and HandTotal.blackjack.fget(self)
+
+    def split_off(self, rank: int) -> "Hand":
+        """Move the second card of a pair to a new hand with the same bet. rank is the rank of the pair."""
+        new_hand = Hand(self.bet, split=True)
+        new_hand.deal(self.cards.pop(), rank)
+        self.reset()
+        self.add(rank)
+        self.split = True
+        return new_hand
+
+    def settle(self, outcome: str, payout: int):
+        self.outcome = outcome
+        self.payout = payout
+        self.settled = True
+
+    def __str__(self) -> str:
+        return f"{len(self.cards)} cards, {HandTotal.__str__(self)}, bet {self.bet}"
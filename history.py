@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Binary hand history.
+# Every seat's round is one fixed-width record appended to a log file (one log
+# per table): the shoe state before the round, the bets, the settlement, every
+# card (6 bits each, the card code from cards.py) and every action (3 bits each).
+# Records are buffered and written in batches. A log is read by mapping it into
+# memory as a numpy structured array, so fields are read straight from the file
+# without parsing it.
+#
+# File layout: a HEADER_SIZE byte header (magic, version, record size, shoe
+# settings and the table's seed) followed by the records, all little-endian.
+
+import struct
+
+import numpy as np
+
+from engine import OUTCOME_CODES, OUTCOMES
+from policy import DOUBLE_DOWN, HIT, INSURANCE, SPLIT, STAND
+
+
+MAGIC = b"BJHL"
+VERSION = 1
+HEADER_SIZE = 128
+# magic, version, record size, decks, penetration (0 for none), seed (utf-8, zero padded)
+HEADER = struct.Struct("<4sHHBf111s")
+
+ACTIONS = (HIT, STAND, DOUBLE_DOWN, SPLIT, INSURANCE)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+CARD_BITS = 6
+ACTION_BITS = 3
+MAX_HANDS = 4
+# Every hand of a seat, one after the other
+PLAYER_SLOTS = 28
+# Dealer never needs more than 12 cards to reach 17
+DEALER_SLOTS = 12
+ACTION_SLOTS = 24
+
+# flags
+RESHUFFLED = 1
+DOUBLED = 8  # in hand_outcomes, next to the outcome code
+# The round had more cards or actions than there are slots, the counts are right but the extra ones are not stored
+TRUNCATED = 2
+
+RECORD = np.dtype([
+    # Table round this record belongs to
+    ("round", "<u4"),
+    # Shoe state before the round: how many times it had been shuffled, and the next card
+    ("shuffles", "<u4"),
+    ("position", "<u2"),
+    ("seat", "u1"),
+    ("flags", "u1"),
+    ("bet", "<u4"),
+    ("insurance_bet", "<u4"),
+    ("net", "<i4"),
+    ("hands", "u1"),
+    ("dealer_count", "u1"),
+    ("action_count", "u1"),
+    ("hand_counts", "u1", (MAX_HANDS,)),
+    ("hand_outcomes", "u1", (MAX_HANDS,)),
+    ("player_cards", "u1", (PLAYER_SLOTS * CARD_BITS // 8,)),
+    ("dealer_cards", "u1", (DEALER_SLOTS * CARD_BITS // 8,)),
+    ("actions", "u1", (ACTION_SLOTS * ACTION_BITS // 8,)),
+])
+RECORD_STRUCT = struct.Struct(f"<IIHBBIIiBBB{MAX_HANDS}s{MAX_HANDS}s{PLAYER_SLOTS * CARD_BITS // 8}s"
+                              f"{DEALER_SLOTS * CARD_BITS // 8}s{ACTION_SLOTS * ACTION_BITS // 8}s")
+assert RECORD_STRUCT.size == RECORD.itemsize
+
+
+def pack_bits(values, bits: int, slots: int) -> bytes:
+    packed = 0
+    for index, value in enumerate(values[:slots]):
+        packed |= value << (index * bits)
+    return packed.to_bytes(slots * bits // 8, "little")
+
+
+def unpack_bits(field: np.ndarray, bits: int) -> np.ndarray:
+    """Unpack a packed field of records (shape (n, bytes)) into one value per slot (shape (n, slots))."""
+    field = np.asarray(field, dtype=np.uint8)
+    unpacked = np.unpackbits(field, axis=-1, bitorder="little")
+    unpacked = unpacked.reshape(*field.shape[:-1], -1, bits)
+    return (unpacked << np.arange(bits, dtype=np.uint8)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_record(round_number: int, seat: int, shuffles: int, position: int, bet: int, result) -> bytes:
+    player_cards = [card for hand in result.hands for card in hand.cards]
+    actions = [ACTION_CODES[action] for action in result.actions]
+    flags = RESHUFFLED if result.reshuffled else 0
+    if (len(player_cards) > PLAYER_SLOTS or len(actions) > ACTION_SLOTS or
+            len(result.hands) > MAX_HANDS):
+        flags |= TRUNCATED
+    hands = result.hands[:MAX_HANDS]
+    return RECORD_STRUCT.pack(
+        round_number, shuffles, position, seat, flags,
+        bet, result.insurance_bet, result.net,
+        len(result.hands), len(result.dealer_cards), min(len(actions), 255),
+        bytes(min(len(hand.cards), 255) for hand in hands),
+        bytes(OUTCOME_CODES[hand.outcome] | (DOUBLED if hand.doubled else 0) for hand in hands),
+        pack_bits(player_cards, CARD_BITS, PLAYER_SLOTS),
+        pack_bits(result.dealer_cards, CARD_BITS, DEALER_SLOTS),
+        pack_bits(actions, ACTION_BITS, ACTION_SLOTS),
+    )
+
+
+class HistoryWriter:
+    """
+    Append-only hand history of one table. Records are buffered and written
+    `batch` at a time; call flush() or close() (or use it as a context manager)
+    to write out the rest.
+    """
+
+    def __init__(self, path, seed=None, decks: int = 1, penetration: float = None, batch: int = 4096):
+        self.path = path
+        self.batch = batch
+        self.buffer = bytearray()
+        self.buffered = 0
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, decks, penetration or 0,
+                                        str(seed if seed is not None else "").encode()).ljust(HEADER_SIZE, b"\0"))
+        else:
+            # Appending to an existing log, it has to be one of ours
+            read_header(path)
+
+    def write(self, round_number: int, seat: int, shuffles: int, position: int, bet: int, result):
+        # result is an engine.RoundResult, bet the seat's initial bet
+        self.buffer += pack_record(round_number, seat, shuffles, position, bet, result)
+        self.buffered += 1
+        if self.buffered >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+            self.buffered = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path) -> dict:
+    with open(path, "rb") as file:
+        magic, version, record_size, decks, penetration, seed = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{path} is not a version {VERSION} hand history")
+    return {"decks": decks, "penetration": penetration or None, "seed": seed.rstrip(b"\0").decode()}
+
+
+def read_history(path) -> np.memmap:
+    """Map a log's records into memory (read only) as an array of RECORD."""
+    read_header(path)
+    return np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE)
+
+
+def player_cards(records) -> np.ndarray:
+    # Card codes of every slot, only the first sum(hand_counts) of a record are cards
+    return unpack_bits(records["player_cards"], CARD_BITS)
+
+
+def dealer_cards(records) -> np.ndarray:
+    return unpack_bits(records["dealer_cards"], CARD_BITS)
+
+
+def actions(records) -> np.ndarray:
+    return unpack_bits(records["actions"], ACTION_BITS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from cards import name
+
+    parser = argparse.ArgumentParser(description="Summarize a hand history log")
+    parser.add_argument("path")
+    parser.add_argument("--show", type=int, default=3, help="print the first SHOW records")
+    args = parser.parse_args()
+
+    header = read_header(args.path)
+    records = read_history(args.path)
+    print(f"{len(records):,} records, seed {header['seed']!r}, {header['decks']} decks, "
+          f"penetration {header['penetration']}")
+    if len(records):
+        outcomes = records["hand_outcomes"][:, 0] & (DOUBLED - 1)
+        print(f"net {int(records['net'].sum()):,} on {int(records['bet'].sum()):,} bet, "
+              + ", ".join(f"{outcome} {int((outcomes == code).sum()):,}" for code, outcome in enumerate(OUTCOMES)))
+    for record, cards, dealer, played in zip(records[:args.show], player_cards(records[:args.show]),
+                                             dealer_cards(records[:args.show]), actions(records[:args.show])):
+        count = int(record["hand_counts"][:record["hands"]].sum())
+        print(f"round {record['round']} seat {record['seat']}: "
+              f"{', '.join(name(card) for card in cards[:count])} | "
+              f"dealer {', '.join(name(card) for card in dealer[:record['dealer_count']])} | "
+              f"{' '.join(ACTIONS[action] for action in played[:record['action_count']])} | net {record['net']}")
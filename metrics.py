@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Counters and timers for the phases of a round.
+# A Metrics object belongs to one table (or one console game). Phases are
+# timed with the monotonic perf_counter clock: `with metrics.time(RENDER):`
+# around a block, metrics.timed(INPUT, read) around a function, or
+# clock()/lap() where even a with statement costs too much (the engine).
+# Time spent waiting on the player (INPUT) or pausing (PAUSE) is timed too,
+# inside the phase it happens in, so a phase's time includes its waits.
+#
+# A disabled Metrics records nothing: time() hands back a do-nothing context
+# manager and timed() the function itself, and the engine does not time at all.
+#
+# summary() is a table for people, prometheus_text() the Prometheus text
+# format (one series per table, labelled), for a textfile collector to scrape.
+
+import os
+import time
+
+
+# Phases of a round
+BET = "bet"
+DEAL = "deal"
+DECISIONS = "decisions"
+DEALER = "dealer"
+SETTLE = "settle"
+RENDER = "render"
+# Waits, timed inside the phases above
+INPUT = "input"
+PAUSE = "pause"
+
+PHASES = (BET, DEAL, DECISIONS, DEALER, SETTLE, RENDER, INPUT, PAUSE)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return None
+
+
+class Metrics:
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, enabled: bool = True, labels: dict = None):
+        self.enabled = enabled
+        # Prometheus labels of every series, e.g. {"table": "3"}
+        self.labels = dict(labels or {})
+        self.counters = {}
+        # Phase -> [times timed, total seconds, longest]
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name: str, seconds: float):
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+    def time(self, name: str):
+        """Context manager timing its block as the phase name."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str, function):
+        """function, timed as the phase name on every call (function itself when disabled)."""
+        if not self.enabled:
+            return function
+
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed_function
+
+    def lap(self, name: str, start: float) -> float:
+        # Record the time since start (from clock()) as the phase name and return the time now
+        now = time.perf_counter()
+        self.record(name, now - start)
+        return now
+
+    def merge(self, other: "Metrics"):
+        """Add other's counters and timings to these (e.g. to keep the totals of a closed table)."""
+        for name, amount in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        for name, (count, total, longest) in other.timings.items():
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += count
+            timing[1] += total
+            timing[2] = max(timing[2], longest)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        title = ", ".join(f"{key} {value}" for key, value in self.labels.items())
+        lines = [f"{title + ': ' if title else ''}{elapsed:.2f}s",
+                 f"{'phase':<12}{'count':>9}{'total s':>11}{'mean ms':>11}{'max ms':>11}{'share':>8}"]
+        # Known phases in round order, then anything else that was timed
+        names = [name for name in PHASES if name in self.timings] + [name for name in self.timings if name not in PHASES]
+        for name in names:
+            count, total, longest = self.timings[name]
+            lines.append(f"{name:<12}{count:>9,}{total:>11.3f}{total / count * 1000:>11.3f}{longest * 1000:>11.3f}"
+                         f"{total / elapsed if elapsed else 0:>8.1%}")
+        if self.counters:
+            lines.append(", ".join(f"{name} {amount:,}" for name, amount in self.counters.items()))
+        return "\n".join(lines)
+
+    def prometheus(self, prefix: str = "blackjack") -> str:
+        return prometheus_text([self], prefix)
+
+
+DISABLED = Metrics(enabled=False)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text(metrics: list, prefix: str = "blackjack") -> str:
+    """Snapshot of several Metrics (one per table) in the Prometheus text exposition format."""
+    seconds, counts, longest = [], [], []
+    # Counter name -> its lines, every counter is its own family
+    counters = {}
+    for table in metrics:
+        for name, (count, total, most) in table.timings.items():
+            labels = _labels({**table.labels, "phase": name})
+            seconds.append(f"{prefix}_phase_seconds_total{labels} {total:.9f}")
+            counts.append(f"{prefix}_phase_count_total{labels} {count}")
+            longest.append(f"{prefix}_phase_max_seconds{labels} {most:.9f}")
+        for name, amount in table.counters.items():
+            counters.setdefault(name, []).append(f"{prefix}_{name}_total{_labels(table.labels)} {amount}")
+    lines = [f"# HELP {prefix}_phase_seconds_total Wall-clock time spent in each phase of a round",
+             f"# TYPE {prefix}_phase_seconds_total counter", *seconds,
+             f"# HELP {prefix}_phase_count_total Times each phase was timed",
+             f"# TYPE {prefix}_phase_count_total counter", *counts,
+             f"# HELP {prefix}_phase_max_seconds Longest single time of each phase",
+             f"# TYPE {prefix}_phase_max_seconds gauge", *longest]
+    for name in sorted(counters):
+        lines += [f"# TYPE {prefix}_{name}_total counter", *counters[name]]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, metrics: list, prefix: str = "blackjack"):
+    # Written to a temporary file and renamed, so a scraper never reads half a snapshot
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        file.write(prometheus_text(metrics, prefix))
+    os.replace(temporary, path)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Pacing of the console game.
+# The pauses blackjack() used to make with time.sleep are named beats, and a
+# profile says how long each beat lasts. "classic" keeps the original timings,
+# "quick" shortens them and "fast" plays without any pause. With skip_on_key,
+# pressing a key cuts the current pause short.
+#
+# Pacer.wait() blocks, for the console game. Pacer.pause() is the same pause as
+# a coroutine, so a game running under an event loop (the server's tables, which
+# share one Pacer) does not hold it up. Only wait() can be cut short by a key.
+
+import sys
+import time
+
+
+# Where the game pauses
+DEAL = "deal"                # cards have been dealt
+BUST = "bust"                # a busted hand is on the table
+REVEAL = "reveal"            # dealer checks his cards, and again once they are shown
+DEALER_DRAW = "dealer_draw"  # table shown between two dealer cards
+DEALER_CARD = "dealer_card"  # dealer picks up a card
+DEALER_DONE = "dealer_done"  # dealer has finished drawing
+SETTLE = "settle"            # the result of a hand is on the table
+
+BEATS = (DEAL, BUST, REVEAL, DEALER_DRAW, DEALER_CARD, DEALER_DONE, SETTLE)
+
+# Seconds per beat
+PROFILES = {
+    "classic": {DEAL: 0, BUST: 2, REVEAL: 3, DEALER_DRAW: 2, DEALER_CARD: 1.5, DEALER_DONE: 1, SETTLE: 2},
+    "quick": {DEAL: 0, BUST: 0.8, REVEAL: 0.8, DEALER_DRAW: 0.6, DEALER_CARD: 0.4, DEALER_DONE: 0.3, SETTLE: 0.8},
+    "fast": {beat: 0 for beat in BEATS},
+}
+
+
+class Pacer:
+    def __init__(self, profile="classic", skip_on_key: bool = False, stream=None):
+        # profile is the name of one of PROFILES or a dict of seconds per beat (missing beats don't pause)
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown pacing profile {profile!r}, expected one of {', '.join(PROFILES)}")
+            profile = PROFILES[profile]
+        self.durations = {beat: profile.get(beat, 0) for beat in BEATS}
+        self.skip_on_key = skip_on_key
+        self.stream = stream if stream is not None else sys.stdin
+
+    def wait(self, beat: str):
+        """Pause for the beat, cut short by a keypress if skip_on_key is set and input is a terminal."""
+        seconds = self.durations[beat]
+        if seconds <= 0:
+            return
+        if self.skip_on_key and self.stream.isatty():
+            try:
+                import termios
+            except ImportError:
+                # No termios (Windows), no skipping
+                pass
+            else:
+                return self._wait_for_key(seconds, termios)
+        time.sleep(seconds)
+
+    def _wait_for_key(self, seconds: float, termios):
+        import select
+        import tty
+        fd = self.stream.fileno()
+        attributes = termios.tcgetattr(fd)
+        try:
+            # Characters arrive one at a time without echo, instead of a line at a time
+            tty.setcbreak(fd)
+            ready, _, _ = select.select([fd], [], [], seconds)
+            if ready:
+                # Swallow the key so it is not read as the answer to the next question
+                termios.tcflush(fd, termios.TCIFLUSH)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, attributes)
+
+    async def pause(self, beat: str):
+        """Awaitable version of wait(), for code running under an event loop."""
+        seconds = self.durations[beat]
+        if seconds <= 0:
+            return
+        # Imported here, the console game never pauses under an event loop and would pay for it at start up
+        import asyncio
+        await asyncio.sleep(seconds)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Policies decide what a player does with their hand.
+# A policy is any object with a decide(observation) method returning one of the
+# legal actions. The console game, the headless engine and the simulators all
+# ask a policy, so a human at the keyboard (ConsolePolicy) is just one
+# implementation next to fixed thresholds and basic strategy tables.
+
+from typing import NamedTuple, Protocol
+
+
+# Actions a policy can return (names match the Player methods they dispatch to)
+HIT = "hit"
+STAND = "stand"
+DOUBLE_DOWN = "double_down"
+SPLIT = "split"
+INSURANCE = "insurance"
+
+
+class Observation(NamedTuple):
+    # Cards in the hand, as card codes in the engine or Card objects in the console game
+    player_cards: tuple
+    player_points: int
+    # An Ace is being counted as 11
+    soft: bool
+    # Two cards of the same rank
+    pair: bool
+    # Value of the dealer's face up card (2-11)
+    dealer_upcard: int
+    legal_actions: tuple
+    bet: int
+
+
+class Policy(Protocol):
+    def decide(self, observation: Observation) -> str:
+        ...
+
+
+class ThresholdPolicy:
+    # Hit below a fixed total, stand otherwise (the strategy simulate.py plays)
+    def __init__(self, stand_on: int = 17):
+        self.stand_on = stand_on
+
+    def decide(self, observation: Observation) -> str:
+        return HIT if observation.player_points < self.stand_on else STAND
+
+
+class StrategyPolicy:
+    # Play the basic strategy table generated by strategy.py
+    letters = {"H": HIT, "S": STAND, "D": DOUBLE_DOWN, "P": SPLIT}
+
+    def __init__(self, table: dict = None, decks: int = 1):
+        if table is None:
+            from strategy import load_table
+            table = load_table(decks)
+        self.rows = table["rows"]
+        self.fallback = table["fallback"]
+        # Column of each upcard value (2-10, A) in the table rows
+        self.columns = {value: value - 2 for value in range(2, 11)}
+        self.columns[11] = 9
+
+    def row(self, observation: Observation, can_split: bool) -> str:
+        points = observation.player_points
+        if observation.pair and can_split:
+            return f"pair {'A' if observation.soft else points // 2}"
+        if observation.soft:
+            return f"soft {points}"
+        return f"hard {points}"
+
+    def decide(self, observation: Observation) -> str:
+        legal = observation.legal_actions
+        row = self.row(observation, SPLIT in legal)
+        if row not in self.rows:
+            # Totals outside the table: hard 4 and soft 12 always hit, 21 always stands
+            return HIT if observation.player_points < 21 else STAND
+        letter = self.rows[row][self.columns[observation.dealer_upcard]]
+        action = self.letters[letter]
+        if action not in legal:
+            action = self.letters[self.fallback[row][self.columns[observation.dealer_upcard]]]
+        return action
+
+
+class ConsolePolicy:
+    # A human typing their decision, with the responses blackjack() has always accepted
+    options = {HIT: "Hit", STAND: "Stand", DOUBLE_DOWN: "Double down", SPLIT: "Split", INSURANCE: "place an Insurance Bet"}
+    responses = {
+        HIT: ("hit", "h", "y", "1"),
+        STAND: ("stand", "s", "n", "2"),
+        DOUBLE_DOWN: ("double down", "doubledown", "dd", "d", "3"),
+        SPLIT: ("split", "ss", "4"),
+        INSURANCE: ("insurance bet", "insurancebet", "insurance", "bet", "ib", "i", "b", "5"),
+    }
+    aid = {
+        HIT: "For Hitting, type: hit, h, y, or 1",
+        STAND: "For Standing, type: stand, s, n, or 2",
+        DOUBLE_DOWN: "For Doubling down, type: double down, doubledown, dd, d, or 3",
+        SPLIT: "For Splitting, type: split, ss, or 4",
+        INSURANCE: "For Placing an Insurance Bet, type: insurance bet, insurancebet, insurance, bet, ib, i, b, or 5",
+    }
+
+    def __init__(self, width: int = 80, read=input, write=print):
+        self.width = width
+        self.read = read
+        self.write = write
+
+    def decide(self, observation: Observation) -> str:
+        width = self.width
+        legal = observation.legal_actions
+        acceptable_responses = {response: action for action in legal for response in self.responses[action]}
+
+        if INSURANCE in legal:
+            self.write(f"""{"Dealer is showing an Ace. Would you like to place an insurance bet?".center(width)}
+{"(Payout is 2:1 on the insurance line and up to half of your current bet can be wagered)".center(width)}
+            """)
+
+        options = [self.options[action] for action in legal]
+        question = f"{', '.join(options[:-1])} or {options[-1]}?"
+        while True:
+            self.write(question.center(width))
+            response = self.read().lower()
+            if response in acceptable_responses:
+                return acceptable_responses[response]
+            nl = "\n"
+            self.write(f"""
+{"Please give a valid response.".center(width)}
+{nl.join(self.aid[action].center(width) for action in legal)}
+                                """)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Profiling the game and the simulations (--profile PREFIX on their command lines).
+# "cprofile" traces every call with cProfile. From Python 3.12 one profiler
+# sees every thread (it runs on sys.monitoring, which allows only one profiler
+# per process); before, threads started during the run (table.py's pool) get a
+# profiler each, merged at the end. "sample" is a stack
+# sampler: a thread records the stack of every other thread every interval,
+# which costs little enough for long simulations but gives no call counts.
+#
+# Both write PREFIX.pstats (for pstats, snakeviz...) and PREFIX.collapsed, one
+# "frame;frame;frame count" line per stack for flamegraph.pl, speedscope or
+# inferno. cProfile only knows callers and callees, so its stacks are rebuilt
+# from the call graph, splitting a function's time between its callers.
+#
+# Functions are named by their qualified name, so the closures of blackjack()
+# read blackjack.hit_or_stand instead of a bare hit_or_stand.
+
+import cProfile
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+
+MODES = ("cprofile", "sample")
+DEFAULT_INTERVAL = 0.005
+# Stacks of the call graph below this many seconds are dropped from the collapsed output
+MIN_SECONDS = 1e-6
+
+
+@lru_cache(maxsize=None)
+def _qualnames(filename: str) -> dict:
+    # (first line, name) -> qualified name of every function defined in a source file
+    # linecache finds files given relative to a sys.path entry too
+    source = "".join(linecache.getlines(filename))
+    try:
+        code = compile(source, filename, "exec")
+    except (SyntaxError, ValueError):
+        return {}
+    names = {}
+    codes = [code]
+    while codes:
+        code = codes.pop()
+        names[(code.co_firstlineno, code.co_name)] = getattr(code, "co_qualname", code.co_name)
+        codes += [constant for constant in code.co_consts if hasattr(constant, "co_code")]
+    return names
+
+
+def function_name(function: tuple) -> str:
+    """Readable name of a pstats function key (filename, line, name), e.g. blackjack.hit_or_stand."""
+    filename, line, name = function
+    if filename == "~" or filename.startswith("<"):
+        # Built-ins, and code that has no file
+        return name
+    return _qualnames(filename).get((line, name), name).replace(".<locals>", "")
+
+
+def frame_name(function: tuple) -> str:
+    # Frame of a collapsed stack: module:function (collapsed stacks are split on ";")
+    filename, _, _ = function
+    name = function_name(function)
+    if filename != "~" and not filename.startswith("<"):
+        name = f"{os.path.splitext(os.path.basename(filename))[0]}:{name}"
+    return name.replace(";", ",")
+
+
+def readable(stats: dict) -> dict:
+    """pstats stats with every function renamed to its function_name()."""
+    def rename(function: tuple) -> tuple:
+        return function[0], function[1], function_name(function)
+    return {rename(function): (cc, nc, tt, ct, {rename(caller): edge for caller, edge in callers.items()})
+            for function, (cc, nc, tt, ct, callers) in stats.items()}
+
+
+def collapse_call_graph(stats: dict) -> Counter:
+    """Collapsed stacks (in microseconds) rebuilt from a cProfile call graph."""
+    children = {}
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, tt, ct) in callers.items():
+            children.setdefault(caller, []).append((function, tt, ct))
+    stacks = Counter()
+
+    def walk(function: tuple, path: tuple, on_path: frozenset, tt: float, ct: float):
+        path += (frame_name(function),)
+        if tt >= MIN_SECONDS:
+            stacks[";".join(path)] += round(tt * 1e6)
+        total = stats[function][3]
+        if not total:
+            return
+        # The share of the function's time spent on this path goes to its callees in the same proportion
+        share = ct / total
+        for child, child_tt, child_ct in children.get(function, ()):
+            if child not in on_path and child_ct * share >= MIN_SECONDS:
+                walk(child, path, on_path | {child}, child_tt * share, child_ct * share)
+
+    for function, (_, _, tt, ct, callers) in stats.items():
+        if not callers:
+            walk(function, (), frozenset([function]), tt, ct)
+    return stacks
+
+
+class Sampler:
+    """
+    Stack sampler. Between start() and stop(), records the stack of every other
+    thread every interval seconds, as collapsed stacks (one count per sample)
+    and as pstats stats (seconds between samples), so pstats.Stats(sampler) works.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        # Function -> [samples, samples, seconds at the top of the stack, seconds on the stack, {caller: edge}]
+        self.functions = {}
+        self.stats = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # The time since the last sample goes to the stacks seen now
+            elapsed, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(names.get(ident, str(ident)), frame, elapsed)
+
+    def _sample(self, thread: str, frame, elapsed: float):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[";".join([thread] + [frame_name(function) for function in stack])] += 1
+
+        functions = self.functions
+        for function in set(stack):
+            entry = functions.get(function)
+            if entry is None:
+                entry = functions[function] = [0, 0, 0.0, 0.0, {}]
+            entry[0] += 1
+            entry[1] += 1
+            entry[3] += elapsed
+        functions[stack[-1]][2] += elapsed
+        for caller, callee in set(zip(stack, stack[1:])):
+            edge = functions[callee][4].setdefault(caller, [0, 0, 0.0, 0.0])
+            edge[0] += 1
+            edge[1] += 1
+            edge[3] += elapsed
+            if callee == stack[-1]:
+                edge[2] += elapsed
+
+    def create_stats(self):
+        self.stats = {function: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+                      for function, (cc, nc, tt, ct, callers) in self.functions.items()}
+
+
+def write_collapsed(stacks: Counter, path: str):
+    with open(path, "w") as file:
+        for stack, count in sorted(stacks.items()):
+            if count > 0:
+                file.write(f"{stack} {count}\n")
+
+
+def _write(stats: pstats.Stats, stacks: Counter, prefix: str):
+    # Nothing is written for a run that recorded nothing, pstats could not load it
+    if stats.stats:
+        stats.dump_stats(f"{prefix}.pstats")
+        write_collapsed(stacks, f"{prefix}.collapsed")
+
+
+def _nothing_recorded(mode: str) -> RuntimeError:
+    what = "no samples (the run was shorter than the interval)" if mode == "sample" else "no calls"
+    return RuntimeError(f"The profiler recorded {what}, no profile written")
+
+
+def _merge(profiles: list) -> pstats.Stats:
+    # One readable Stats of every profile (pstats.Stats refuses to load a profile that saw no calls)
+    stats = pstats.Stats()
+    for profiler in profiles:
+        profiler.create_stats()
+        if profiler.stats:
+            stats.add(profiler)
+    stats.stats = readable(stats.stats)
+    return stats
+
+
+def profile(function, prefix: str, mode: str = "cprofile", interval: float = DEFAULT_INTERVAL):
+    """
+    Call function() under the profiler and return its result. PREFIX.pstats and
+    PREFIX.collapsed are written when it returns or raises (e.g. a game left with Ctrl-C),
+    and RuntimeError is raised if the profiler recorded nothing.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiler {mode!r}, expected one of {', '.join(MODES)}")
+    if mode == "sample":
+        sampler = Sampler(interval)
+        sampler.start()
+        try:
+            result = function()
+        finally:
+            sampler.stop()
+            stats = _merge([sampler])
+            _write(stats, sampler.stacks, prefix)
+        if not stats.stats:
+            raise _nothing_recorded(mode)
+        return result
+
+    main = cProfile.Profile()
+    thread_profiles = []
+    # Threads whose profiler would not start (they run unprofiled rather than die and leave the run waiting)
+    failures = []
+
+    def start_thread_profile(frame, event, arg):
+        # Every thread started from here on gets its own profiler, started by the first event it sees
+        thread_profile = cProfile.Profile()
+        try:
+            thread_profile.enable()
+        except ValueError as error:
+            # This hook is the thread's profile function until a profiler replaces it
+            sys.setprofile(None)
+            failures.append(error)
+        else:
+            thread_profiles.append(thread_profile)
+
+    per_thread = sys.version_info < (3, 12)
+    # Raises ValueError if another profiler is running
+    main.enable()
+    if per_thread:
+        threading.setprofile(start_thread_profile)
+    try:
+        result = function()
+    finally:
+        if per_thread:
+            threading.setprofile(None)
+        main.disable()
+        stats = _merge([main] + thread_profiles)
+        _write(stats, collapse_call_graph(stats.stats), prefix)
+    if failures:
+        raise RuntimeError(f"{len(failures)} threads could not be profiled ({failures[0]}), "
+                           "their calls are missing from the profile")
+    if not stats.stats:
+        raise _nothing_recorded(mode)
+    return result
+
+
+def add_arguments(parser):
+    # The --profile options shared by every command line
+    parser.add_argument("--profile", metavar="PREFIX", default=None,
+                        help="profile the run and write PREFIX.pstats and PREFIX.collapsed (flamegraph stacks)")
+    parser.add_argument("--profiler", choices=MODES, default="cprofile",
+                        help="trace every call (cprofile) or sample stacks (sample, lower overhead)")
+
+
+def run(function, args):
+    """Call function(), under the profiler if --profile was given."""
+    if args.profile is None:
+        return function()
+    return profile(function, args.profile, args.profiler)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Record and replay console sessions.
+# blackjack() is deterministic given the rng it shuffles with and the answers
+# it reads, so a session is stored as a seed and the list of lines the player
+# typed. Replaying feeds those lines back to blackjack() with no pauses and
+# no output, which plays a round in well under a millisecond.
+#
+# index() replays a session once and remembers, for the start of every round,
+# the rng state right before that round's shuffle, how many answers had been
+# read and the player's money and record. seek() then starts a fresh game
+# from any round's snapshot, so going to round n does not replay the rounds
+# before it. From there the game is handed to the keyboard (play()) or to a
+# function that looks at the player and the deck (inspect()).
+
+import contextlib
+import json
+import random
+import sys
+from dataclasses import dataclass
+
+from blackjack import blackjack
+from cards import name
+from pacing import Pacer
+from screen import Screen, supports_ansi
+
+
+@dataclass
+class RoundStart:
+    # Number of answers read before the round's bet
+    offset: int
+    # random.Random state right before the round's deck was shuffled
+    rng_state: tuple
+    money: int
+    wins: int
+    ties: int
+    losses: int
+
+
+class _SnapshotRandom(random.Random):
+    # Remembers its state before every shuffle (blackjack() shuffles once per round)
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.states = []
+
+    def shuffle(self, x):
+        self.states.append(self.getstate())
+        super().shuffle(x)
+
+
+class _Stop(Exception):
+    pass
+
+
+class _Output:
+    # Output of a replay goes nowhere until the game is handed over. What was printed
+    # since the last answer is kept, so the question waiting for an answer can be shown then.
+    def __init__(self):
+        self.target = None
+        self.pending = []
+
+    def write(self, text: str):
+        if self.target is None:
+            self.pending.append(text)
+        else:
+            self.target.write(text)
+
+    def flush(self):
+        if self.target is not None:
+            self.target.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def answered(self):
+        self.pending.clear()
+
+    def hand_over(self, target):
+        self.target = target
+        target.write("".join(self.pending))
+        self.pending.clear()
+
+
+def record(seed=None, path: str = None, **game_options) -> dict:
+    """
+    Play an interactive game, recording every answer. Returns the session
+    ({"seed": ..., "inputs": [...]}) and saves it to path as JSON if given,
+    even if the game is interrupted.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    session = {"seed": seed, "inputs": []}
+
+    def read() -> str:
+        line = input()
+        session["inputs"].append(line)
+        return line
+
+    try:
+        blackjack(rng=random.Random(seed), read=read, **game_options)
+    finally:
+        if path is not None:
+            save(session, path)
+    return session
+
+
+def save(session: dict, path: str):
+    with open(path, "w") as file:
+        json.dump(session, file)
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+class Replay:
+    def __init__(self, session: dict):
+        self.seed = session["seed"]
+        self.inputs = session["inputs"]
+        self.rounds = None
+
+    def _run(self, rng: random.Random, inputs: list, on_round, on_end=None, pace: str = "classic"):
+        # Play inputs through blackjack() without output or pauses, on_end() answers once they run out
+        terminal = sys.stdout
+        output = _Output()
+        screen = Screen(ansi=supports_ansi(terminal), stream=output)
+        pacer = Pacer("fast")
+        position = 0
+
+        def read() -> str:
+            nonlocal position
+            if position < len(inputs):
+                position += 1
+                output.answered()
+                return inputs[position - 1]
+            if on_end is None:
+                raise _Stop
+            if output.target is None:
+                # Hand over: show the question being asked and pause normally from now on
+                output.hand_over(terminal)
+                pacer.durations = Pacer(pace).durations
+            return on_end()
+
+        with contextlib.redirect_stdout(output):
+            try:
+                blackjack(rng=rng, read=read, on_round=lambda player: on_round(player, position),
+                          screen=screen, pacer=pacer)
+            except _Stop:
+                pass
+
+    def index(self) -> list:
+        """Replay the whole session once and return (and keep) the RoundStart of every round."""
+        if self.rounds is None:
+            rng = _SnapshotRandom(self.seed)
+            rounds = []
+
+            def on_round(player, offset):
+                rounds.append(RoundStart(offset, rng.states[-1], player.money,
+                                         player.wins, player.ties, player.losses))
+
+            self._run(rng, self.inputs, on_round)
+            self.rounds = rounds
+        return self.rounds
+
+    def seek(self, round_number: int, on_round=None, on_end=None, rounds: int = None, pace: str = "classic"):
+        """
+        Start a game at the beginning of round_number (0 is the first round), without
+        replaying the rounds before it, and replay `rounds` recorded rounds from there
+        (all the rest if None).
+
+        :param on_round: called with the player at the start of every round played
+        :param on_end: answers the questions once the recorded answers run out (input to
+                       hand the game over to the keyboard), the game stops there if None
+        :param pace: pacing profile once the game is handed over
+        """
+        index = self.index()
+        if not 0 <= round_number < len(index):
+            raise ValueError(f"The session has rounds 0-{len(index) - 1}, not {round_number}")
+        start = index[round_number]
+        rng = random.Random()
+        rng.setstate(start.rng_state)
+        end = round_number + rounds if rounds is not None else len(index)
+        stop = index[end].offset if end < len(index) else len(self.inputs)
+        # The player's name, then the answers from the round on
+        inputs = self.inputs[:index[0].offset] + self.inputs[start.offset:stop]
+        first = True
+
+        def restore(player, offset):
+            nonlocal first
+            if first:
+                player.money, player.wins, player.ties, player.losses = (start.money, start.wins,
+                                                                         start.ties, start.losses)
+                first = False
+            if on_round is not None:
+                on_round(player)
+
+        self._run(rng, inputs, restore, on_end, pace)
+
+    def inspect(self, round_number: int, hook):
+        """Call hook(player) at the start of round_number and stop there."""
+        terminal = sys.stdout
+
+        def stop(player):
+            with contextlib.redirect_stdout(terminal):
+                hook(player)
+            raise _Stop
+
+        self.seek(round_number, stop, rounds=0)
+
+    def play(self, round_number: int, pace: str = "classic"):
+        """Fast forward to the start of round_number and hand the game over to the keyboard from there."""
+        self.seek(round_number, on_end=input, rounds=0, pace=pace)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Record blackjack sessions and replay them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="play and record the session")
+    record_parser.add_argument("session")
+    record_parser.add_argument("--seed", type=int, default=None)
+    show_parser = commands.add_parser("show", help="show the player and the deck at the start of a round")
+    show_parser.add_argument("session")
+    show_parser.add_argument("--round", type=int, default=0)
+    play_parser = commands.add_parser("play", help="fast forward to a round and carry on playing")
+    play_parser.add_argument("session")
+    play_parser.add_argument("--round", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.seed, args.session)
+    else:
+        replay = Replay(load(args.session))
+        start = time.perf_counter()
+        rounds = replay.index()
+        print(f"{len(rounds)} rounds indexed in {(time.perf_counter() - start) * 1000:.1f} ms")
+        if args.command == "show":
+            def show(player):
+                upcoming = ", ".join(name(code) for code in player.deck.upcoming(4))
+                print(f"Round {args.round}: {player.name} has ${player.money} "
+                      f"({player.wins} wins, {player.ties} ties, {player.losses} losses)")
+                print(f"Next cards: {upcoming}")
+
+            start = time.perf_counter()
+            replay.inspect(args.round, show)
+            print(f"seeked in {(time.perf_counter() - start) * 1000:.1f} ms")
+        else:
+            replay.play(args.round)
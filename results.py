@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Columnar results store.
+# A store is a directory of chunks. Every chunk holds one row per hand, split
+# into one .npy file per column ("<chunk>.<column>.npy"), so a query only reads
+# the columns it needs, straight from memory-mapped files. Chunks are written
+# independently (simulate.py writes each of its chunks from the worker that
+# played it) and scanned independently, on a process pool if asked.
+#
+# Aggregates (outcome rates, EV by upcard, bankroll curves) are vectorized
+# scans: bincounts and cumulative sums over each chunk, combined at the end.
+#
+# Requires numpy.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import OUTCOMES
+
+
+# Column name -> dtype
+COLUMNS = {
+    # Money on the hand (doubled bets included), 1 unit per hand in simulate.py
+    "bet": np.uint32,
+    # Outcome code, see engine.OUTCOMES: bust, lose, tie, win, blackjack
+    "outcome": np.uint8,
+    "player_total": np.uint8,
+    "dealer_total": np.uint8,
+    # Value of the dealer's face up card (2-11)
+    "upcard": np.uint8,
+    # Hi-Lo running count of the shoe before the round (0 for a fresh deck)
+    "count": np.int16,
+    # Net result of the hand in money (or units of bet)
+    "net": np.float32,
+}
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+
+def write_chunk(path: str, name: str, **columns) -> int:
+    """Write one chunk (every column in COLUMNS, all the same length) and return its number of rows."""
+    os.makedirs(path, exist_ok=True)
+    rows = {len(values) for values in columns.values()}
+    if set(columns) != set(COLUMNS) or len(rows) != 1:
+        raise ValueError(f"A chunk needs the columns {', '.join(COLUMNS)}, all of the same length")
+    for column, dtype in COLUMNS.items():
+        np.save(os.path.join(path, f"{name}.{column}.npy"), np.asarray(columns[column], dtype=dtype))
+    return rows.pop()
+
+
+class ResultsWriter:
+    """Collect rows one at a time or in arrays, and write a chunk every chunk_rows rows."""
+
+    def __init__(self, path: str, prefix: str = "", chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.path = path
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.chunks = 0
+        self.rows = {column: [] for column in COLUMNS}
+        self.buffered = 0
+
+    def append(self, **row):
+        for column, values in self.rows.items():
+            values.append(row[column])
+        self.buffered += 1
+        if self.buffered >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            write_chunk(self.path, f"{self.prefix}{self.chunks:06d}", **self.rows)
+            self.chunks += 1
+            self.rows = {column: [] for column in COLUMNS}
+            self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_column(path: str, chunk: str, column: str) -> np.ndarray:
+    return np.load(os.path.join(path, f"{chunk}.{column}.npy"), mmap_mode="r")
+
+
+class ResultsStore:
+    def __init__(self, path: str):
+        self.path = path
+        suffix = ".outcome.npy"
+        # Chunks in name order, which is the order they were written in
+        self.chunks = sorted(name[:-len(suffix)] for name in os.listdir(path) if name.endswith(suffix))
+
+    def chunk_rows(self) -> list:
+        # Read from the .npy headers, the data is not touched
+        return [len(load_column(self.path, chunk, "outcome")) for chunk in self.chunks]
+
+    def __len__(self) -> int:
+        return sum(self.chunk_rows())
+
+    def scan(self, function, columns: tuple, workers: int = 1, arguments: list = None) -> list:
+        """
+        Call function({column: array}, *arguments[i]) on every chunk i and return the results in chunk order.
+        function has to be a module level function when workers is not 1.
+
+        :param workers: processes to spread the chunks over (None uses every core)
+        """
+        if arguments is None:
+            arguments = [()] * len(self.chunks)
+        tasks = [(self.path, chunk, columns, function, extra) for chunk, extra in zip(self.chunks, arguments)]
+        if workers == 1:
+            return [_scan_chunk(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_scan_chunk, tasks))
+
+
+def _scan_chunk(task):
+    path, chunk, columns, function, extra = task
+    return function({column: load_column(path, chunk, column) for column in columns}, *extra)
+
+
+def _outcome_counts(columns: dict) -> np.ndarray:
+    return np.bincount(columns["outcome"], minlength=len(OUTCOMES))
+
+
+def _upcard_sums(columns: dict) -> np.ndarray:
+    upcard = columns["upcard"]
+    return np.stack([np.bincount(upcard, minlength=12),
+                     np.bincount(upcard, weights=columns["bet"], minlength=12),
+                     np.bincount(upcard, weights=columns["net"], minlength=12)])
+
+
+def _bankroll_points(columns: dict, positions: np.ndarray) -> tuple:
+    # Bankroll (relative to the start of the chunk) after each row in positions, and the chunk's total
+    balance = np.cumsum(columns["net"], dtype=np.float64)
+    return balance[positions], balance[-1] if len(balance) else 0.0
+
+
+def outcome_rates(store: ResultsStore, workers: int = 1) -> dict:
+    """Hands, and the share of hands per outcome plus overall win (blackjack included), tie and loss (bust included) rates."""
+    counts = np.sum(store.scan(_outcome_counts, ("outcome",), workers), axis=0)
+    hands = int(counts.sum())
+    rates = {name: count / hands if hands else 0.0 for name, count in zip(OUTCOMES, counts)}
+    rates["hands"] = hands
+    rates["win_rate"] = rates["win"] + rates["blackjack"]
+    rates["tie_rate"] = rates["tie"]
+    rates["loss_rate"] = rates["lose"] + rates["bust"]
+    return rates
+
+
+def ev_by_upcard(store: ResultsStore, workers: int = 1) -> dict:
+    """{upcard value: (hands, expected net per unit bet)} for every upcard seen."""
+    hands, bet, net = np.sum(store.scan(_upcard_sums, ("upcard", "bet", "net"), workers), axis=0)
+    return {upcard: (int(hands[upcard]), net[upcard] / bet[upcard]) for upcard in range(2, 12) if hands[upcard]}
+
+
+def bankroll_curve(store: ResultsStore, points: int = 1000, start: float = 0.0, workers: int = 1) -> tuple:
+    """
+    Bankroll after every row, sampled at `points` evenly spaced rows.
+    Returns (row numbers, bankroll after that row).
+    """
+    rows = np.array(store.chunk_rows(), dtype=np.int64)
+    total = int(rows.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    samples = np.unique(np.linspace(0, total - 1, min(points, total)).astype(np.int64))
+    first_rows = np.concatenate([[0], np.cumsum(rows)[:-1]])
+    chunk_of = np.searchsorted(first_rows, samples, side="right") - 1
+    arguments = [(samples[chunk_of == index] - first_rows[index],) for index in range(len(rows))]
+    scanned = store.scan(_bankroll_points, ("net",), workers, arguments)
+    # Each chunk's balances start from the total of the chunks before it
+    offsets = start + np.concatenate([[0.0], np.cumsum([chunk_total for _, chunk_total in scanned])[:-1]])
+    balance = np.concatenate([chunk_points + offset for (chunk_points, _), offset in zip(scanned, offsets)])
+    return samples, balance
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Aggregate a results store")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 uses every core)")
+    parser.add_argument("--points", type=int, default=10, help="points of the bankroll curve to print")
+    args = parser.parse_args()
+    workers = args.workers or None
+
+    start = time.perf_counter()
+    store = ResultsStore(args.path)
+    rates = outcome_rates(store, workers)
+    print(f"{rates['hands']:,} hands in {len(store.chunks)} chunks: win {rates['win_rate']:.4%}, "
+          f"tie {rates['tie_rate']:.4%}, loss {rates['loss_rate']:.4%} (blackjack {rates['blackjack']:.4%}, "
+          f"bust {rates['bust']:.4%})")
+    print("EV by dealer upcard:")
+    for upcard, (hands, ev) in ev_by_upcard(store, workers).items():
+        print(f"  {'A' if upcard == 11 else upcard:>2}: {ev:+.4f} over {hands:,} hands")
+    rows, balance = bankroll_curve(store, args.points, workers=workers)
+    print("Bankroll: " + ", ".join(f"{row + 1:,}: {value:+,.1f}" for row, value in zip(rows, balance)))
+    print(f"{time.perf_counter() - start:.2f}s")
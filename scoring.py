@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Hand scoring through a precomputed state table.
+# Instead of re-summing the whole hand and then turning Aces from 11 into 1
+# (get_points + ace_check_player/ace_check_dealer), a hand is a single small
+# int state. Adding a card is one lookup in NEXT[state * 13 + rank], and the
+# points, soft flag, bust, two card blackjack and pair status of a state are
+# lookups in the tables below. Card values are never changed, so the same cards
+# can safely be reused by the next round.
+#
+# The tables are plain arrays so the console game, the engine and the NumPy
+# simulator all score with the very same transitions.
+
+from array import array
+
+from cards import ranks, rank_values
+
+
+N_RANKS = len(ranks)
+
+
+def _build_tables():
+    # A state is identified while building by (hard total with Aces as 1, holds an Ace,
+    # number of cards capped at 3, rank of the first card, rank of a two card pair).
+    # Busted hands only keep their hard total.
+    empty = (0, False, 0, -1, -1)
+    keys = [empty]
+    index = {empty: 0}
+    transitions = []
+
+    position = 0
+    while position < len(keys):
+        key = keys[position]
+        position += 1
+        row = []
+        for rank in range(N_RANKS):
+            if key[0] > 21:
+                # Busted hands stay busted
+                row.append(index[key])
+                continue
+            hard, ace, count, first, _ = key
+            hard += 1 if rank_values[rank] == 11 else rank_values[rank]
+            ace = ace or rank_values[rank] == 11
+            if hard > 21:
+                new_key = (hard, False, 3, -1, -1)
+            elif count == 0:
+                new_key = (hard, ace, 1, rank, -1)
+            elif count == 1:
+                new_key = (hard, ace, 2, -1, rank if rank == first else -1)
+            else:
+                new_key = (hard, ace, 3, -1, -1)
+            if new_key not in index:
+                index[new_key] = len(keys)
+                keys.append(new_key)
+            row.append(index[new_key])
+        transitions.extend(row)
+
+    next_state = array('B', transitions)
+    hard = array('B', (key[0] for key in keys))
+    soft = array('B', (key[1] and key[0] <= 11 for key in keys))
+    points = array('B', (key[0] + 10 if key[1] and key[0] <= 11 else key[0] for key in keys))
+    bust = array('B', (key[0] > 21 for key in keys))
+    blackjack = array('B', (key[2] == 2 and key[1] and key[0] == 11 for key in keys))
+    # Rank of the pair + 1, or 0 if the hand is not a two card pair
+    pair = array('B', (key[4] + 1 for key in keys))
+    return next_state, hard, soft, points, bust, blackjack, pair
+
+
+NEXT, HARD, SOFT, POINTS, BUST, BLACKJACK, PAIR = _build_tables()
+N_STATES = len(HARD)
+EMPTY = 0
+
+
+def score(hand_ranks) -> int:
+    """Chain the transitions for a sequence of rank indexes and return the final state."""
+    state = EMPTY
+    for rank in hand_ranks:
+        state = NEXT[state * N_RANKS + rank]
+    return state
+
+
+class HandTotal:
+    __slots__ = ("state",)
+
+    def __init__(self):
+        self.state = EMPTY
+
+    def add(self, rank: int):
+        # rank is the index into ranks (0 is Ace)
+        self.state = NEXT[self.state * N_RANKS + rank]
+
+    @property
+    def hard(self) -> int:
+        return HARD[self.state]
+
+    @property
+    def points(self) -> int:
+        return POINTS[self.state]
+
+    @property
+    def is_soft(self) -> bool:
+        # An Ace is currently being counted as 11
+        return bool(SOFT[self.state])
+
+    @property
+    def bust(self) -> bool:
+        return bool(BUST[self.state])
+
+    @property
+    def blackjack(self) -> bool:
+        return bool(BLACKJACK[self.state])
+
+    @property
+    def pair(self) -> bool:
+        return bool(PAIR[self.state])
+
+    def reset(self):
+        self.state = EMPTY
+
+    def __str__(self) -> str:
+        return f"{'soft' if self.is_soft else 'hard'} {self.points}"
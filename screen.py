@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Terminal output for the console game.
+# The game used to clear the screen by printing 100 newlines and then print the
+# stats and the table again after every action. Screen keeps the last frame it
+# drew and, on an ANSI terminal, moves the cursor to the rows that changed and
+# rewrites only those. On a dumb terminal (or when output is not a terminal) it
+# falls back to the newlines and full redraws.
+#
+# On an ANSI terminal the screen is split in two: the frame stays at the top,
+# and the bottom `margin` rows are a scroll region where the prompts and
+# messages go, so they scroll there without moving the frame. A frame taller
+# than the rows above the prompts loses its blank lines first, then its first
+# lines (like a full redraw scrolling off the top would).
+
+import os
+import shutil
+import sys
+
+
+ESC = "\x1b["
+
+
+def supports_ansi(stream=None) -> bool:
+    stream = stream if stream is not None else sys.stdout
+    return stream.isatty() and os.environ.get("TERM", "dumb") not in ("", "dumb")
+
+
+class Screen:
+    # Rows at the bottom of the terminal kept for prompts and messages
+    margin = 6
+    # Fewer rows than this above the prompts and frames are drawn in full instead
+    min_frame_rows = 8
+
+    def __init__(self, ansi: bool = None, rows: int = None, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.ansi = supports_ansi(self.stream) if ansi is None else ansi
+        self.rows = rows if rows is not None else shutil.get_terminal_size((80, 24)).lines
+        # Rows the frame can use
+        self.frame_rows = self.rows - self.margin
+        # Lines of the frame on screen, None if the screen has to be redrawn from scratch
+        self.last = None
+        self.bytes_written = 0
+        # The prompt scroll region is set
+        self.split = False
+
+    def write(self, text: str):
+        self.bytes_written += len(text)
+        self.stream.write(text)
+        self.stream.flush()
+
+    @property
+    def prompt_row(self) -> int:
+        # First row of the prompt area (rows are numbered from 1)
+        return self.frame_rows + 1
+
+    def clear(self):
+        # Start a new frame, the next draw() replaces the old one
+        if not self.ansi:
+            self.write("\n" * 100 + "\n")
+
+    def reset(self):
+        # Clear the whole screen now (before printing something that is not a frame)
+        if not self.ansi:
+            self.write("\n" * 100 + "\n")
+            return
+        self.last = None
+        if self.frame_rows < self.min_frame_rows:
+            self.write(f"{ESC}H{ESC}2J")
+            return
+        self.split = True
+        # Prompts scroll between the prompt row and the bottom, and start at the prompt row
+        self.write(f"{ESC}{self.prompt_row};{self.rows}r{ESC}H{ESC}2J{ESC}{self.prompt_row};1H")
+
+    def close(self):
+        # Give the whole terminal back to scrolling output (when the game ends), below everything on screen
+        if self.split:
+            self.split = False
+            self.write(f"{ESC}r{ESC}{self.rows};1H\n")
+
+    def fit(self, lines: list) -> list:
+        if len(lines) <= self.frame_rows:
+            return lines
+        # Squeeze runs of blank lines into one, then keep the bottom of the frame
+        squeezed = [line for number, line in enumerate(lines)
+                    if line.strip() or number == 0 or lines[number - 1].strip()]
+        return squeezed[-self.frame_rows:]
+
+    def draw(self, *parts: str):
+        """Show a frame made of parts, each printed as print(part) would."""
+        text = "".join(part + "\n" for part in parts)
+        if not self.ansi:
+            self.write(text)
+            return
+
+        lines = text.split("\n")[:-1]
+        if not self.split:
+            # Too few rows to keep the prompts apart, or reset() was never called: draw it all from the top
+            self.write(f"{ESC}H{ESC}2J{text}")
+            self.last = lines
+            return
+
+        lines = self.fit(lines)
+        last = self.last if self.last is not None else []
+        changed = []
+        for row in range(max(len(lines), len(last))):
+            line = lines[row] if row < len(lines) else ""
+            if row >= len(last) or last[row] != line or self.last is None:
+                # Rows are numbered from 1, erase what is left of the old line
+                changed.append(f"{ESC}{row + 1};1H{line}{ESC}K")
+        # Empty the prompt area and start the prompts at its top
+        changed.append(f"{ESC}{self.prompt_row};1H{ESC}J")
+        self.write("".join(changed))
+        self.last = lines
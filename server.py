@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Text-mode blackjack over TCP (telnet or nc to the port and play).
+# One asyncio process serves every connection: a client is a pair of streams,
+# every question is an awaited read, and a table is a task that plays rounds of
+# engine.TableRound for the clients seated at it (one each with --seats 1, or
+# up to seven sharing a shoe and a dealer).
+#
+# A client cannot hold up a table: reads time out (--timeout), and output waits
+# for the client to take it (backpressure) only up to --drain-timeout. A client
+# that times out is dropped, and the hands they were playing stand.
+#
+# With --metrics, every table times the phases of its rounds, waiting on its
+# clients and its pauses (see metrics.py), and a snapshot of every table is
+# written to a file every --metrics-interval seconds.
+
+import asyncio
+import random
+
+import engine
+from glyphs import BACK, render_cards
+from metrics import BET, DECISIONS, DISABLED, INPUT, PAUSE, RENDER, Metrics, write_prometheus
+from pacing import REVEAL, SETTLE, Pacer
+from policy import DOUBLE_DOWN, INSURANCE, SPLIT, STAND, ConsolePolicy
+from scoring import HandTotal
+from shoe import Shoe
+
+
+STARTING_MONEY = 1000
+WIDTH = 80
+# Longest line a client can send
+LINE_LIMIT = 1024
+# Connections waiting to be accepted, so a burst of clients is not turned away
+BACKLOG = 4096
+
+ordinals = ["first", "second", "third", "fourth"]
+
+# What the console game says for every outcome
+outcome_messages = {
+    "blackjack": "BLACKJACK! {name} wins! You recieve ${payout}.",
+    "win": "{name} wins! You recieve ${payout}.",
+    "tie": "It's a tie! Your bet is returned (${payout}).",
+    "lose": "Dealer wins. You lose ${bet}.",
+    "bust": "BUST! You lose ${bet}.",
+}
+
+
+class Disconnected(Exception):
+    # The client left, stopped reading or stopped answering
+    pass
+
+
+class Client:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 timeout: float = 120, drain_timeout: float = 10):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.drain_timeout = drain_timeout
+        self.name = "You"
+        self.money = STARTING_MONEY
+        # Set once the client has left (or been dropped)
+        self.left = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        return not self.left.is_set()
+
+    async def send(self, text: str):
+        if not self.connected:
+            raise Disconnected
+        self.writer.write(text.replace("\n", "\r\n").encode())
+        try:
+            # Backpressure: wait for the client to take the output, but not forever
+            await asyncio.wait_for(self.writer.drain(), self.drain_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.close()
+            raise Disconnected
+
+    async def ask(self, question: str) -> str:
+        await self.send(question + "\n")
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.LimitOverrunError, ValueError):
+            # ValueError is a line over LINE_LIMIT
+            line = b""
+        if not line:
+            self.close()
+            raise Disconnected
+        return line.decode(errors="replace").strip()
+
+    def close(self):
+        if self.connected:
+            self.left.set()
+            self.writer.close()
+
+
+def render_table(table_round: engine.TableRound, names: list, reveal: bool = False, width: int = WIDTH) -> str:
+    # The table as the console game shows it, the dealer's hole card stays face down until reveal
+    dealer_cards = table_round.dealer_cards
+    shown = dealer_cards if reveal else dealer_cards[1:]
+    dealer_codes = tuple(dealer_cards) if reveal else (BACK,) + tuple(dealer_cards[1:])
+    dealer = HandTotal()
+    for card in shown:
+        dealer.add(engine.RANK[card])
+    lines = ["-" * width,
+             f"Dealer has {len(dealer_cards)} cards and {dealer.points} points".center(width),
+             render_cards(dealer_codes, width)]
+    for name, hands in zip(names, table_round.hands):
+        for number, hand in enumerate(hands):
+            label = name if len(hands) == 1 else f"{name}'s {ordinals[number]} hand"
+            lines.append(render_cards(tuple(hand.cards), width))
+            lines.append(f"{label} has {len(hand.cards)} cards and {hand.points} points".center(width))
+    lines.append("-" * width)
+    return "\n".join(lines) + "\n"
+
+
+class Table:
+    def __init__(self, number: int, seats: int = 1, decks: int = 6, penetration: float = 0.75,
+                 rules: engine.Rules = engine.DEFAULT_RULES, pacer: Pacer = None, seed=None, metrics: Metrics = None):
+        if not 1 <= seats <= engine.MAX_SEATS:
+            raise ValueError(f"A table has between 1 and {engine.MAX_SEATS} seats, not {seats}")
+        self.number = number
+        self.seats = seats
+        self.rules = rules
+        self.pacer = pacer if pacer is not None else Pacer("quick")
+        self.shoe = Shoe(random.Random(seed), decks=decks, penetration=penetration)
+        self.players = []
+        # Clients who sat down during a round, they are dealt in from the next one
+        self.joining = []
+        self.task = None
+        self.metrics = metrics if metrics is not None else DISABLED
+
+    def free(self) -> bool:
+        return len(self.players) + len(self.joining) < self.seats
+
+    def sit(self, client: Client):
+        self.joining.append(client)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        try:
+            while True:
+                self.players += self.joining
+                self.joining.clear()
+                self.players = [client for client in self.players if client.connected]
+                if not self.players:
+                    break
+                await self.play_round()
+        finally:
+            for client in self.players + self.joining:
+                client.close()
+
+    async def leave(self, client: Client, message: str):
+        try:
+            await client.send(message.center(WIDTH) + "\n")
+        except Disconnected:
+            pass
+        client.close()
+
+    async def ask_bet(self, client: Client) -> int:
+        # 0 if the client leaves the table
+        try:
+            while True:
+                with self.metrics.time(INPUT):
+                    response = await client.ask(
+                        f"Place your bet (you have ${client.money} available for betting, q to leave the table)")
+                if response.lower() in ("q", "quit", "n", "no"):
+                    if client.money > STARTING_MONEY:
+                        message = f"Congrats! You have left the table with ${client.money}. Thank you for playing!"
+                    else:
+                        message = f"You have left the table with ${client.money}. Better luck next time!"
+                    await self.leave(client, message)
+                    return 0
+                if response.isdigit() and 1 <= int(response) <= client.money:
+                    return int(response)
+                await client.send(f"Not a valid betting amount. Please choose a number between 1 and {client.money}\n")
+        except Disconnected:
+            return 0
+
+    async def decide(self, client: Client, table_round: engine.TableRound, names: list, observation) -> str:
+        if not client.connected:
+            return STAND
+        # Offer only what the client can pay for
+        costs = {DOUBLE_DOWN: observation.bet, SPLIT: observation.bet, INSURANCE: int(observation.bet / 2)}
+        legal = [action for action in observation.legal_actions if costs.get(action, 0) <= client.money]
+        responses = {response: action for action in legal for response in ConsolePolicy.responses[action]}
+        options = [ConsolePolicy.options[action] for action in legal]
+        question = f"{', '.join(options[:-1])} or {options[-1]}?".center(WIDTH)
+        try:
+            with self.metrics.time(RENDER):
+                table = render_table(table_round, names)
+            await client.send(table)
+            while True:
+                with self.metrics.time(INPUT):
+                    response = (await client.ask(question)).lower()
+                if response in responses:
+                    action = responses[response]
+                    client.money -= costs.get(action, 0)
+                    return action
+                await client.send("Please give a valid response.\n" +
+                                  "\n".join(ConsolePolicy.aid[action] for action in legal) + "\n")
+        except Disconnected:
+            return STAND
+
+    async def broadcast(self, clients: list, text: str):
+        # Clients are sent to concurrently, so a slow one only costs its own drain timeout
+        await asyncio.gather(*(client.send(text) for client in clients if client.connected), return_exceptions=True)
+
+    async def pause(self, beat: str):
+        with self.metrics.time(PAUSE):
+            await self.pacer.pause(beat)
+
+    async def play_round(self):
+        metrics = self.metrics
+        with metrics.time(BET):
+            bets = await asyncio.gather(*(self.ask_bet(client) for client in self.players))
+        seated = [(client, bet) for client, bet in zip(self.players, bets) if bet and client.connected]
+        self.players = [client for client, _ in seated]
+        if not seated:
+            return
+        clients = self.players
+        names = [client.name for client in clients]
+        for client, bet in seated:
+            client.money -= bet
+
+        metrics.count("rounds")
+        table_round = engine.TableRound([bet for _, bet in seated], self.shoe, rules=self.rules, metrics=metrics)
+        steps = table_round.play()
+        try:
+            seat, observation = next(steps)
+            while True:
+                with metrics.time(DECISIONS):
+                    action = await self.decide(clients[seat], table_round, names, observation)
+                seat, observation = steps.send(action)
+        except StopIteration as stop:
+            results = stop.value
+        metrics.count("hands", sum(len(result.hands) for result in results))
+
+        await self.broadcast(clients, "Dealer checks his cards...".center(WIDTH) + "\n")
+        await self.pause(REVEAL)
+        with metrics.time(RENDER):
+            table = render_table(table_round, names, reveal=True)
+        messages = []
+        for client, result in zip(clients, results):
+            client.money += result.payout
+            lines = [table]
+            for number, hand in enumerate(result.hands):
+                prefix = "" if len(result.hands) == 1 else f"{client.name}'s {ordinals[number]} hand: "
+                lines.append(prefix + outcome_messages[hand.outcome].format(name=client.name, payout=hand.payout, bet=hand.bet))
+            if result.insurance_bet:
+                lines.append(f"Insurance bet of ${result.insurance_bet} paid ${result.insurance_payout}.")
+            lines.append(f"{client.name}'s money: {client.money}")
+            messages.append(client.send("\n".join(lines) + "\n") if client.connected else asyncio.sleep(0))
+        await asyncio.gather(*messages, return_exceptions=True)
+        await self.pause(SETTLE)
+
+        for client in clients:
+            if client.money <= 0 and client.connected:
+                await self.leave(client, "Game is over! You are bankrupt")
+
+
+class Lobby:
+    def __init__(self, seats: int = 1, seed=None, instrument: bool = False, **table_options):
+        self.seats = seats
+        self.seed = seed
+        # Give every table a Metrics, the totals of the tables that have closed are kept in closed
+        self.instrument = instrument
+        self.closed = Metrics(enabled=instrument, labels={"table": "closed"})
+        self.table_options = table_options
+        self.tables = []
+        self.opened = 0
+        self.snapshots = None
+
+    def seat(self, client: Client) -> Table:
+        for table in self.tables:
+            # A table whose last player just left is about to be removed
+            if table.free() and not table.task.done():
+                table.sit(client)
+                return table
+        # Every table gets its own reproducible stream from the seed, as in table.py
+        seed = None if self.seed is None else f"{self.seed}/{self.opened}"
+        metrics = Metrics(labels={"table": self.opened}) if self.instrument else None
+        table = Table(self.opened, self.seats, seed=seed, metrics=metrics, **self.table_options)
+        self.opened += 1
+        self.tables.append(table)
+        table.sit(client)
+        table.task.add_done_callback(lambda _: self.close(table))
+        return table
+
+    def close(self, table: Table):
+        self.tables.remove(table)
+        if self.instrument:
+            self.closed.merge(table.metrics)
+
+    def metrics(self) -> list:
+        # Metrics of every open table and the closed tables' totals
+        return [table.metrics for table in self.tables if table.metrics.enabled] + [self.closed]
+
+    async def write_metrics(self, path: str, interval: float = 10):
+        while True:
+            write_prometheus(path, self.metrics())
+            await asyncio.sleep(interval)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           timeout: float = 120, drain_timeout: float = 10):
+        client = Client(reader, writer, timeout, drain_timeout)
+        try:
+            name = ""
+            while name == "":
+                name = await client.ask("What is your name?")
+            client.name = name.title()
+            table = self.seat(client)
+            await client.send(f"{client.name} sits down at table {table.number}.\n")
+            await client.left.wait()
+        except Disconnected:
+            pass
+        finally:
+            client.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8023, timeout: float = 120, drain_timeout: float = 10,
+                metrics_path: str = None, metrics_interval: float = 10, **lobby_options) -> asyncio.Server:
+    lobby = Lobby(instrument=metrics_path is not None, **lobby_options)
+    if metrics_path is not None:
+        lobby.snapshots = asyncio.create_task(lobby.write_metrics(metrics_path, metrics_interval))
+    return await asyncio.start_server(
+        lambda reader, writer: lobby.serve_client(reader, writer, timeout, drain_timeout),
+        host, port, limit=LINE_LIMIT, backlog=BACKLOG)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pacing import PROFILES
+
+    parser = argparse.ArgumentParser(description="Serve blackjack tables over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--seats", type=int, default=1, help=f"players per table (1-{engine.MAX_SEATS})")
+    parser.add_argument("--decks", type=int, default=6)
+    parser.add_argument("--penetration", type=float, default=0.75)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds a client has to answer")
+    parser.add_argument("--drain-timeout", type=float, default=10, help="seconds a client has to take its output")
+    parser.add_argument("--pace", choices=list(PROFILES), default="quick")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--metrics", default=None, help="file to write per table phase timings to (Prometheus text)")
+    parser.add_argument("--metrics-interval", type=float, default=10, help="seconds between two metrics snapshots")
+    args = parser.parse_args()
+
+    async def main():
+        server = await serve(args.host, args.port, args.timeout, args.drain_timeout, args.metrics,
+                             args.metrics_interval, seats=args.seats,
+                             seed=args.seed, decks=args.decks, penetration=args.penetration,
+                             pacer=Pacer(args.pace))
+        print(f"Serving blackjack on {args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Array-backed shoe of card codes (see cards.py).
+# Instead of a list of 52 Card objects rebuilt on every reset, the shoe keeps one
+# permutation buffer and a draw cursor: drawing moves the cursor, resetting
+# rewinds it and reshuffles the same buffer in place. Nothing is allocated per round.
+#
+# A shoe holds 1-8 decks. With a penetration set, a cut card is placed that far
+# into the shoe and the shoe is only reshuffled before the next round once the
+# cut card has come out. Without one, it is reshuffled every round like the Deck
+# in blackjack(), which deals from a one deck Shoe too.
+# If the shoe runs out in the middle of a round anyway (a deep cut card, a full
+# table), only the discards are reshuffled: the cards on the table stay out.
+
+import random
+
+import cards
+
+
+MAX_DECKS = 8
+
+
+class Shoe:
+    # shuffled=False leaves the cards in order, for an owner that shuffles them itself (Deck in blackjack.py)
+    def __init__(self, rng: random.Random = None, decks: int = 1, penetration: float = None, shuffled: bool = True):
+        if not 1 <= decks <= MAX_DECKS:
+            raise ValueError(f"A shoe holds between 1 and {MAX_DECKS} decks, not {decks}")
+        if penetration is not None and not 0 < penetration <= 1:
+            raise ValueError(f"Penetration must be a fraction of the shoe in (0, 1], not {penetration}")
+        self.rng = rng if rng is not None else random.Random()
+        self.decks = decks
+        self.penetration = penetration
+        self.cards = cards.new_deck() * decks
+        # Index of the cut card, the shoe is dealt to the end if there is no penetration
+        self.cut = len(self.cards) if penetration is None else int(len(self.cards) * penetration)
+        self.position = 0
+        # Where the current round's cards start, the cards before it are discards
+        self.round_start = 0
+        self.shuffles = 0
+        if shuffled:
+            self.shuffle()
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+        self.shuffles += 1
+
+    def draw(self) -> int:
+        # Out of cards in the middle of a round, shuffle the discards and carry on
+        if self.position == len(self.cards):
+            self.reshuffle_discards()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+    def reset(self):
+        self.position = 0
+        self.round_start = 0
+        self.shuffle()
+
+    def reshuffle_discards(self):
+        # The round's cards move to the front (they have been dealt), the shuffled discards follow
+        in_play = self.cards[self.round_start:]
+        discards = self.cards[:self.round_start]
+        if not discards:
+            raise RuntimeError(f"A round used all {len(self.cards)} cards of the shoe")
+        self.rng.shuffle(discards)
+        self.cards[:] = in_play + discards
+        # The round now starts at the front: running out again in the same round leaves no discards
+        self.position = len(in_play)
+        self.round_start = 0
+        # Counted as a shuffle, so the round shows up as reshuffled
+        self.shuffles += 1
+
+    @property
+    def cut_card_out(self) -> bool:
+        return self.position >= self.cut
+
+    @property
+    def due(self) -> bool:
+        # Reshuffled before the next round: cut card out, or any card dealt without a penetration
+        return self.cut_card_out or (self.penetration is None and self.position > 0)
+
+    def start_round(self) -> bool:
+        """Reshuffle if it is due. Returns True if it did."""
+        self.round_start = self.position
+        if self.due:
+            self.reset()
+            return True
+        return False
+
+    def remaining(self) -> int:
+        return len(self.cards) - self.position
+
+    def __str__(self) -> str:
+        return f"Shoe has {self.remaining()} cards"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Batch simulator: deals and settles whole arrays of hands at once with NumPy
+# instead of one Card object at a time. Rules are the ones used by blackjack()
+# and engine.py: aces drop from 11 to 1 only when the hand would go over 21,
+# the dealer draws while on 16 or less, blackjack pays 3:2, a win pays 1:1
+# and equal totals are a tie.
+#
+# Requires numpy.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+import cards
+import results
+import scoring
+from engine import OUTCOME_CODES, OUTCOMES
+
+
+# Rank index of every card in one 52 card deck
+DECK_RANKS = np.array(cards.RANK, dtype=np.uint8)
+RANK_VALUES = np.array(cards.rank_values, dtype=np.uint8)
+
+# Hand state tables from scoring.py, so hands are scored with the same transitions as the game
+NEXT = np.array(scoring.NEXT, dtype=np.uint8).reshape(scoring.N_STATES, scoring.N_RANKS)
+POINTS = np.array(scoring.POINTS, dtype=np.uint8)
+IS_BLACKJACK = np.array(scoring.BLACKJACK, dtype=bool)
+
+# Outcome codes (as in engine.py) and the net result per unit bet for each of them
+BUST, LOSE, TIE, WIN, BLACKJACK = (OUTCOME_CODES[outcome] for outcome in OUTCOMES)
+NET_PER_UNIT = np.array([-1.0, -1.0, 0.0, 1.0, 1.5])
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+@dataclass
+class SimulationResult:
+    hands: int = 0
+    # Sum of net results and of their squares, in units of the initial bet
+    net_sum: float = 0.0
+    net_sq_sum: float = 0.0
+    # Number of hands per outcome code
+    outcomes: tuple = (0, 0, 0, 0, 0)
+
+    @property
+    def mean(self) -> float:
+        return self.net_sum / self.hands if self.hands else 0.0
+
+    @property
+    def house_edge(self) -> float:
+        return -self.mean
+
+    @property
+    def variance(self) -> float:
+        if self.hands < 2:
+            return 0.0
+        return (self.net_sq_sum - self.net_sum ** 2 / self.hands) / (self.hands - 1)
+
+    @property
+    def stderr(self) -> float:
+        return (self.variance / self.hands) ** 0.5 if self.hands else 0.0
+
+    def merge(self, other: "SimulationResult") -> "SimulationResult":
+        return SimulationResult(self.hands + other.hands,
+                                self.net_sum + other.net_sum,
+                                self.net_sq_sum + other.net_sq_sum,
+                                tuple(a + b for a, b in zip(self.outcomes, other.outcomes)))
+
+    def __str__(self) -> str:
+        counts = ", ".join(f"{name}: {count}" for name, count in zip(OUTCOMES, self.outcomes))
+        return (f"{self.hands} hands, house edge {self.house_edge:.4%} "
+                f"(± {self.stderr:.4%}), variance {self.variance:.4f}\n{counts}")
+
+
+def stand_thresholds(stand_on) -> np.ndarray:
+    """
+    Turn a fixed strategy into a lookup indexed by dealer upcard value (2-11).
+    The player hits while their total is below the threshold for the upcard.
+
+    :param stand_on: one total for every upcard, or a mapping {upcard value: total}
+    """
+    thresholds = np.full(12, 17, dtype=np.int8)
+    if isinstance(stand_on, dict):
+        for upcard, total in stand_on.items():
+            thresholds[upcard] = total
+    else:
+        thresholds[:] = stand_on
+    return thresholds
+
+
+def _draw(rng, decks, rows, position):
+    # Partial Fisher-Yates shuffle: only the cards that actually get dealt are shuffled into place
+    top = position[rows]
+    pick = rng.integers(top, decks.shape[1])
+    card = decks[rows, pick]
+    decks[rows, pick] = decks[rows, top]
+    position[rows] = top + 1
+    return card
+
+
+def play_batch(rng: np.random.Generator, n_hands: int, thresholds: np.ndarray) -> np.ndarray:
+    """Deal and settle n_hands independent single deck rounds, returning an outcome code per hand."""
+    return deal_batch(rng, n_hands, thresholds)[0]
+
+
+def deal_batch(rng: np.random.Generator, n_hands: int, thresholds: np.ndarray) -> tuple:
+    """Like play_batch, returning (outcome, player points, dealer points, dealer upcard value) per hand."""
+    # Every hand gets its own deck
+    decks = np.tile(DECK_RANKS, (n_hands, 1))
+    rows = np.arange(n_hands)
+    position = np.zeros(n_hands, dtype=np.intp)
+
+    # Initiate dealing (player, dealer hole card, player, dealer upcard)
+    player = NEXT[scoring.EMPTY, _draw(rng, decks, rows, position)]
+    dealer = NEXT[scoring.EMPTY, _draw(rng, decks, rows, position)]
+    player = NEXT[player, _draw(rng, decks, rows, position)]
+    upcard = _draw(rng, decks, rows, position)
+    dealer = NEXT[dealer, upcard]
+
+    # Player hits every hand below its threshold until all of them stand or bust
+    limit = thresholds[RANK_VALUES[upcard]]
+    active = rows[POINTS[player] < limit]
+    while active.size:
+        states = NEXT[player[active], _draw(rng, decks, active, position)]
+        player[active] = states
+        active = active[POINTS[states] < limit[active]]
+
+    # Dealer draws while on 16 or less (only needed against hands that did not bust)
+    player_points = POINTS[player]
+    active = rows[(player_points <= 21) & (POINTS[dealer] <= 16)]
+    while active.size:
+        states = NEXT[dealer[active], _draw(rng, decks, active, position)]
+        dealer[active] = states
+        active = active[POINTS[states] <= 16]
+    dealer_points = POINTS[dealer]
+
+    # Settlement, same order of checks as check_if_beat_dealer()
+    player_blackjack = IS_BLACKJACK[player]
+    outcome = np.full(n_hands, LOSE, dtype=np.int8)
+    outcome[player_points > dealer_points] = WIN
+    outcome[dealer_points > 21] = WIN
+    outcome[(player_points == dealer_points) & (dealer_points <= 21)] = TIE
+    outcome[player_blackjack & ((player_points > dealer_points) | (dealer_points > 21))] = BLACKJACK
+    outcome[player_points > 21] = BUST
+    return outcome, player_points, dealer_points, RANK_VALUES[upcard]
+
+
+def summarize(outcome: np.ndarray) -> SimulationResult:
+    counts = np.bincount(outcome, minlength=len(OUTCOMES))
+    net = NET_PER_UNIT[: len(counts)]
+    return SimulationResult(int(outcome.size),
+                            float(counts @ net),
+                            float(counts @ (net * net)),
+                            tuple(int(count) for count in counts))
+
+
+def _play_chunk(args) -> SimulationResult:
+    seed_sequence, n_hands, thresholds, store, index = args
+    outcome, player_points, dealer_points, upcard = deal_batch(np.random.default_rng(seed_sequence), n_hands,
+                                                               thresholds)
+    if store is not None:
+        # Every hand is a 1 unit bet on a fresh deck
+        results.write_chunk(store, f"{index:06d}", bet=np.ones(n_hands), outcome=outcome,
+                            player_total=player_points, dealer_total=dealer_points, upcard=upcard,
+                            count=np.zeros(n_hands), net=NET_PER_UNIT[outcome])
+    return summarize(outcome)
+
+
+def simulate(n_hands: int, stand_on=17, seed=None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+             workers: int = 1, store: str = None) -> SimulationResult:
+    """
+    Play n_hands with a fixed hit/stand strategy, chunk_size hands per NumPy batch.
+
+    Every chunk gets its own RNG stream spawned from the master seed, so the
+    merged result for a given seed and chunk_size is identical whatever the
+    number of worker processes.
+
+    :param workers: number of processes to spread the chunks over (None uses every core)
+    :param store: directory of a results store (see results.py) to write every hand to, one chunk per chunk
+    """
+    thresholds = stand_thresholds(stand_on)
+    sizes = [min(chunk_size, n_hands - start) for start in range(0, n_hands, chunk_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(stream, size, thresholds, store, index) for index, (stream, size) in enumerate(zip(streams, sizes))]
+
+    result = SimulationResult()
+    if workers == 1:
+        for chunk in chunks:
+            result = result.merge(_play_chunk(chunk))
+        return result
+
+    # Chunk results come back in submission order, so merging is deterministic
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_result in pool.map(_play_chunk, chunks, chunksize=max(1, len(chunks) // (4 * workers))):
+            result = result.merge(chunk_result)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from profiling import add_arguments, run
+
+    parser = argparse.ArgumentParser(description="Simulate blackjack hands with a fixed strategy")
+    parser.add_argument("hands", type=int, help="number of hands to play")
+    parser.add_argument("--stand-on", type=int, default=17, help="stand on this total or more")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 uses every core)")
+    parser.add_argument("--store", default=None, help="write every hand to this results store (see results.py)")
+    # Only this process is profiled, profile with --workers 1 to see the simulation itself
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = run(lambda: simulate(args.hands, stand_on=args.stand_on, seed=args.seed, workers=args.workers or None,
+                                  store=args.store), args)
+    elapsed = time.perf_counter() - start
+    print(result)
+    print(f"{elapsed:.1f}s ({args.hands / elapsed:,.0f} hands/s)")
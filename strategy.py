@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Basic strategy generator.
+# Computes the expected value of hitting, standing, doubling down and splitting
+# for every starting hand against every dealer upcard by combinatorial analysis
+# (no simulation), under the rules of blackjack(): dealer stands on all 17s and
+# does not peek, blackjack pays 3:2, equal totals tie.
+#
+# Player draws are exact for the shoe composition: every card drawn is removed
+# before the next one, and that recursion is memoized on the composition. The
+# dealer's final-total distribution comes from dealer_odds.py for the shoe left
+# after the player's first two cards and the upcard.
+#
+# Split hands are played one at a time with the same shoe, get one card each,
+# may double after the split and are not resplit. Split Aces get one card only.
+#
+# The resulting strategy table is small and is cached on disk per number of decks.
+
+import json
+import os
+
+from dealer_odds import CLASS_VALUES, OUTCOMES, dealer_distribution, full_shoe, remove
+
+
+HIT = "H"
+STAND = "S"
+DOUBLE_DOWN = "D"
+SPLIT = "P"
+ACTIONS = {HIT: "hit", STAND: "stand", DOUBLE_DOWN: "double_down", SPLIT: "split"}
+
+# Table columns: dealer upcard value classes in the order 2-10, A
+UPCARDS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 0)
+# Table rows
+HARD_TOTALS = range(5, 21)
+SOFT_TOTALS = range(13, 21)
+PAIRS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 0)
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "blackjack")
+
+# Dealer final points for each ending in OUTCOMES (blackjack counts as 21, bust as 0)
+_DEALER_POINTS = tuple(21 if outcome == "blackjack" else 0 if outcome == "bust" else int(outcome)
+                       for outcome in OUTCOMES)
+
+
+def _add(hard: int, ace: bool, value_class: int) -> tuple:
+    value = CLASS_VALUES[value_class]
+    return hard + (1 if value == 11 else value), ace or value == 11
+
+
+def _points(hard: int, ace: bool) -> int:
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+def stand_values(distribution) -> list:
+    """EV of standing on 0-21 points (two card blackjack excluded) against a dealer distribution."""
+    values = []
+    for points in range(22):
+        ev = 0.0
+        for p, dealer_points in zip(distribution, _DEALER_POINTS):
+            if dealer_points == 0 or points > dealer_points:
+                ev += p
+            elif points < dealer_points:
+                ev -= p
+        values.append(ev)
+    return values
+
+
+class _Hand:
+    # EVs of one starting hand against one upcard: shares one stand table and one memo for the draws
+    def __init__(self, counts: bytes, stand: list):
+        self.counts = counts
+        self.stand = stand
+        self.memo = {}
+
+    def hit(self, counts: bytes, hard: int, ace: bool) -> float:
+        """EV of taking a card and then hitting or standing optimally."""
+        key = (counts, hard, ace)
+        if key in self.memo:
+            return self.memo[key]
+        total = sum(counts)
+        ev = 0.0
+        for value_class, count in enumerate(counts):
+            if count == 0:
+                continue
+            p = count / total
+            new_hard, new_ace = _add(hard, ace, value_class)
+            if new_hard > 21:
+                ev -= p
+                continue
+            points = _points(new_hard, new_ace)
+            best = self.stand[points]
+            if points < 21:
+                best = max(best, self.hit(remove(counts, value_class), new_hard, new_ace))
+            ev += p * best
+        self.memo[key] = ev
+        return ev
+
+    def double(self, counts: bytes, hard: int, ace: bool) -> float:
+        total = sum(counts)
+        ev = 0.0
+        for value_class, count in enumerate(counts):
+            if count == 0:
+                continue
+            new_hard, new_ace = _add(hard, ace, value_class)
+            ev += count / total * (-2.0 if new_hard > 21 else 2.0 * self.stand[_points(new_hard, new_ace)])
+        return ev
+
+    def split(self, pair: int) -> float:
+        # Each split hand starts with one card of the pair and draws its second card
+        counts = self.counts
+        total = sum(counts)
+        hard, ace = _add(0, False, pair)
+        ev = 0.0
+        for value_class, count in enumerate(counts):
+            if count == 0:
+                continue
+            rest = remove(counts, value_class)
+            new_hard, new_ace = _add(hard, ace, value_class)
+            points = _points(new_hard, new_ace)
+            if pair == 0:
+                # Split Aces get one card only
+                best = self.stand[points]
+            else:
+                best = max(self.stand[points], self.hit(rest, new_hard, new_ace), self.double(rest, new_hard, new_ace))
+            ev += count / total * best
+        return 2.0 * ev
+
+
+def hand_values(first: int, second: int, upcard: int, shoe: bytes) -> dict:
+    """EV of every action for a starting hand of two value classes against an upcard."""
+    counts = remove(remove(remove(shoe, first), second), upcard)
+    hand = _Hand(counts, stand_values(dealer_distribution(upcard, counts)))
+    hard, ace = _add(*_add(0, False, first), second)
+    values = {
+        HIT: hand.hit(counts, hard, ace),
+        STAND: hand.stand[_points(hard, ace)],
+        DOUBLE_DOWN: hand.double(counts, hard, ace),
+    }
+    if first == second:
+        values[SPLIT] = hand.split(first)
+    return values
+
+
+def _combinations(total: int):
+    # Two card hard hands (no Ace) adding up to total, as value classes
+    for first in range(1, 10):
+        for second in range(first, 10):
+            if CLASS_VALUES[first] + CLASS_VALUES[second] == total:
+                yield first, second
+
+
+def _weight(first: int, second: int, upcard: int, shoe: bytes) -> float:
+    # Relative chance of being dealt this hand against this upcard
+    counts = remove(shoe, upcard)
+    return counts[first] * (counts[second] - (first == second))
+
+
+def expected_values(decks: int = 1) -> dict:
+    """
+    EV per unit bet of every action, keyed by (row, upcard class) where row is
+    "hard 12", "soft 17", "pair 8", ... For hard totals the EVs are averaged over
+    every two card hand making that total, weighted by how likely it is to be dealt.
+    """
+    shoe = full_shoe(decks)
+    table = {}
+    for upcard in UPCARDS:
+        for total in HARD_TOTALS:
+            combined = {}
+            weights = 0.0
+            for first, second in _combinations(total):
+                weight = _weight(first, second, upcard, shoe)
+                weights += weight
+                for action, ev in hand_values(first, second, upcard, shoe).items():
+                    # Pairs count towards their hard total when they are not split
+                    if action != SPLIT:
+                        combined[action] = combined.get(action, 0.0) + weight * ev
+            table[f"hard {total}", upcard] = {action: ev / weights for action, ev in combined.items()}
+        for total in SOFT_TOTALS:
+            table[f"soft {total}", upcard] = hand_values(0, total - 12, upcard, shoe)
+        for pair in PAIRS:
+            table[f"pair {'A' if pair == 0 else CLASS_VALUES[pair]}", upcard] = hand_values(pair, pair, upcard, shoe)
+    return table
+
+
+def build_table(decks: int = 1) -> dict:
+    """
+    Best action per row as a string with one letter per upcard (2-10, A), e.g. "HHSSSHHHHH".
+    "fallback" holds the better of hitting and standing, for when doubling or splitting is not allowed.
+    """
+    values = expected_values(decks)
+    rows = {}
+    fallback = {}
+    for (row, upcard), evs in values.items():
+        rows.setdefault(row, []).append(max(evs, key=evs.get))
+        fallback.setdefault(row, []).append(HIT if evs[HIT] > evs[STAND] else STAND)
+    return {"decks": decks,
+            "upcards": "23456789TA",
+            "rows": {row: "".join(actions) for row, actions in rows.items()},
+            "fallback": {row: "".join(actions) for row, actions in fallback.items()}}
+
+
+def table_path(decks: int, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"basic_strategy_{decks}deck.json")
+
+
+def load_table(decks: int = 1, cache_dir: str = CACHE_DIR, rebuild: bool = False) -> dict:
+    """Load the cached strategy table for this number of decks, computing and saving it first if needed."""
+    path = table_path(decks, cache_dir)
+    if not rebuild and os.path.exists(path):
+        with open(path) as f:
+            table = json.load(f)
+        # Tables saved before fallback rows existed get recomputed
+        if "fallback" in table:
+            return table
+    table = build_table(decks)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(table, f, indent=1)
+    return table
+
+
+def action_for(table: dict, row: str, upcard: int) -> str:
+    """Look up the action letter for a row ("hard 12", "soft 18", "pair 8") and dealer upcard class."""
+    return table["rows"][row][UPCARDS.index(upcard)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate a basic strategy table by combinatorial analysis")
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--rebuild", action="store_true", help="recompute even if a cached table exists")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_table(args.decks, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - start
+    print(f"{'':>8} " + " ".join(table["upcards"]))
+    for row, actions in table["rows"].items():
+        print(f"{row:>8} " + " ".join(actions))
+    print(f"{table_path(args.decks)} ({elapsed:.2f}s)")
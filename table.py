@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Headless tables.
+# A Table owns its shoe, its RNG and up to seven seats, and plays rounds through
+# engine.play_table_round, so every seat is dealt from the same shoe and settled
+# against the same dealer hand. Tables share nothing mutable (the card and scoring tables
+# they read are built once at import and never written), so any number of them
+# can run side by side in a thread pool without locks, including on
+# free-threaded CPython builds.
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import engine
+from cards import HI_LO, VALUE
+from metrics import DISABLED, Metrics, write_prometheus
+from shoe import Shoe
+
+
+@dataclass
+class TableStats:
+    rounds: int = 0
+    # Total amount bet (doubles and insurance included) and net result in money
+    wagered: int = 0
+    net: int = 0
+    wins: int = 0
+    ties: int = 0
+    losses: int = 0
+    reshuffles: int = 0
+
+    def add(self, result: engine.RoundResult):
+        self.rounds += 1
+        self.wagered += result.bet + result.insurance_bet
+        self.net += result.net
+        # Split hands are counted one by one
+        for hand in result.hands:
+            if hand.outcome in ("win", "blackjack"):
+                self.wins += 1
+            elif hand.outcome == "tie":
+                self.ties += 1
+            else:
+                self.losses += 1
+        self.reshuffles += result.reshuffled
+
+    def merge(self, other: "TableStats") -> "TableStats":
+        return TableStats(*(a + b for a, b in zip(self.__dict__.values(), other.__dict__.values())))
+
+
+class Table:
+    def __init__(self, policy, seed=None, decks: int = 1, penetration: float = None, bet: int = 10,
+                 rules: engine.Rules = engine.DEFAULT_RULES, seats: int = 1, history=None, results=None,
+                 metrics: Metrics = None):
+        # policy is either one policy for every seat or a list with a policy per seat
+        self.policies = list(policy) if isinstance(policy, (list, tuple)) else [policy] * seats
+        if not 1 <= len(self.policies) <= engine.MAX_SEATS:
+            raise ValueError(f"A table has between 1 and {engine.MAX_SEATS} seats, not {len(self.policies)}")
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.shoe = Shoe(self.rng, decks=decks, penetration=penetration)
+        self.bet = bet
+        self.seat_stats = [TableStats() for _ in self.policies]
+        # A history.HistoryWriter to log every round to, if any
+        self.history = history
+        # A results.ResultsWriter to add a row per hand to, if any
+        self.results = results
+        # Hi-Lo running count of the cards dealt since the last shuffle
+        self.running_count = 0
+        self.rounds = 0
+        # Phase timers and counters of the table (see metrics.py), disabled unless given
+        self.metrics = metrics if metrics is not None else DISABLED
+
+    @property
+    def stats(self) -> TableStats:
+        # Every seat together (rounds counts seat-rounds), the seats share one shoe and its reshuffles
+        total = TableStats()
+        for stats in self.seat_stats:
+            total = total.merge(stats)
+        total.reshuffles = self.seat_stats[0].reshuffles
+        return total
+
+    def play_round(self) -> list:
+        shuffles, position = self.shoe.shuffles, self.shoe.position
+        # The count starts again from a freshly shuffled shoe
+        fresh = self.shoe.due
+        metrics = self.metrics if self.metrics.enabled else None
+        results = engine.play_table_round([(policy, self.bet) for policy in self.policies],
+                                          shoe=self.shoe, rules=self.rules, metrics=metrics)
+        if metrics is not None:
+            start = metrics.clock()
+        for seat, (stats, result) in enumerate(zip(self.seat_stats, results)):
+            stats.add(result)
+            if self.history is not None:
+                self.history.write(self.rounds, seat, shuffles, position, self.bet, result)
+        if self.results is not None:
+            self.add_results(results, fresh)
+        if metrics is not None:
+            # Keeping stats, history and results
+            metrics.lap("record", start)
+            metrics.count("rounds")
+            metrics.count("hands", sum(len(result.hands) for result in results))
+        self.rounds += 1
+        return results
+
+    def add_results(self, results: list, fresh: bool = False):
+        # Count before the round, every hand of the round gets the same one
+        count = 0 if fresh else self.running_count
+        dealer_cards = results[0].dealer_cards
+        upcard = VALUE[dealer_cards[1]]
+        dealt = sum(HI_LO[card] for card in dealer_cards)
+        for result in results:
+            for number, hand in enumerate(result.hands):
+                net = hand.payout - hand.bet
+                if number == 0:
+                    # Insurance goes with the first hand
+                    net += result.insurance_payout - result.insurance_bet
+                self.results.append(bet=hand.bet, outcome=engine.OUTCOME_CODES[hand.outcome],
+                                    player_total=hand.points, dealer_total=result.dealer_points, upcard=upcard,
+                                    count=count, net=net)
+                dealt += sum(HI_LO[card] for card in hand.cards)
+        if results[0].reshuffled:
+            # Only the cards dealt since the last shuffle count (the discards may have been reshuffled mid-round)
+            self.running_count = sum(HI_LO[card] for card in self.shoe.cards[:self.shoe.position])
+        else:
+            self.running_count = count + dealt
+
+    def play(self, rounds: int) -> TableStats:
+        for _ in range(rounds):
+            self.play_round()
+        return self.stats
+
+
+def table_seed(seed, index: int) -> str:
+    # Every table gets its own reproducible stream from the master seed
+    return f"{seed}/{index}"
+
+
+def run_tables(policy, tables: int, rounds: int, seed=None, workers: int = None, history_dir: str = None,
+               results_dir: str = None, metrics_path: str = None, **table_options) -> list:
+    """
+    Play `rounds` rounds at each of `tables` independent tables on a thread pool.
+    Returns the TableStats of every table, in table order.
+
+    :param policy: shared by every table, so it must not keep per-hand state
+    :param history_dir: log every round of table i to history_dir/table-i.bjh (see history.py)
+    :param results_dir: add every hand to the results store in results_dir (see results.py)
+    :param metrics_path: time the phases of every table and write them to metrics_path in the Prometheus text format
+    :param table_options: decks, penetration, bet, rules and seats for each Table
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    all_tables = [Table(policy, table_seed(seed, index), **table_options) for index in range(tables)]
+    if history_dir is not None:
+        import os
+
+        from history import HistoryWriter
+        os.makedirs(history_dir, exist_ok=True)
+        for index, table in enumerate(all_tables):
+            table.history = HistoryWriter(os.path.join(history_dir, f"table-{index}.bjh"), table_seed(seed, index),
+                                          table.shoe.decks, table.shoe.penetration)
+    if results_dir is not None:
+        from results import ResultsWriter
+        for index, table in enumerate(all_tables):
+            table.results = ResultsWriter(results_dir, prefix=f"table-{index:04d}-")
+    if metrics_path is not None:
+        for index, table in enumerate(all_tables):
+            table.metrics = Metrics(labels={"table": index})
+
+    def play(table: Table) -> TableStats:
+        stats = table.play(rounds)
+        if table.history is not None:
+            table.history.close()
+        if table.results is not None:
+            table.results.close()
+        return stats
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stats = list(pool.map(play, all_tables))
+    if metrics_path is not None:
+        write_prometheus(metrics_path, [table.metrics for table in all_tables])
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from policy import StrategyPolicy
+    from profiling import add_arguments, run
+
+    parser = argparse.ArgumentParser(description="Play many independent headless tables on a thread pool")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=1000, help="rounds per table")
+    parser.add_argument("--decks", type=int, default=6)
+    parser.add_argument("--penetration", type=float, default=0.75)
+    parser.add_argument("--seats", type=int, default=1, help=f"seats per table (1-{engine.MAX_SEATS})")
+    parser.add_argument("--history", default=None, help="directory to log every round to")
+    parser.add_argument("--results", default=None, help="results store to add every hand to")
+    parser.add_argument("--metrics", default=None, help="file to write per table phase timings to (Prometheus text)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run(lambda: run_tables(StrategyPolicy(decks=args.decks), args.tables, args.rounds, seed=args.seed,
+                                     workers=args.workers, history_dir=args.history, results_dir=args.results,
+                                     metrics_path=args.metrics, decks=args.decks, penetration=args.penetration,
+                                     seats=args.seats), args)
+    elapsed = time.perf_counter() - start
+    total = TableStats()
+    for stats in results:
+        total = total.merge(stats)
+    print(total)
+    print(f"{total.rounds / elapsed:,.0f} seat-rounds/s over {args.tables} tables of {args.seats} seats")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Regression checks for engine.py and the console game that plays the same rounds
+# (python3 -m pytest, or python3 test_engine.py).
+
+import contextlib
+import io
+import random
+from array import array
+
+import engine
+from blackjack import blackjack
+from cards import DECK_SIZE, encode
+from pacing import Pacer
+from policy import HIT, INSURANCE, SPLIT, STAND, ThresholdPolicy
+from screen import Screen
+from shoe import Shoe
+
+
+def stacked_shoe(*cards) -> Shoe:
+    # A one deck shoe that deals cards (given as (suit, rank)) first, in that order
+    codes = [encode(suit, rank) for suit, rank in cards]
+    shoe = Shoe(random.Random(0))
+    shoe.cards = array('B', codes + [code for code in range(DECK_SIZE) if code not in codes])
+    return shoe
+
+
+class StackedRandom:
+    # rng for blackjack(): its deck is shuffled so it deals cards (given as (suit, rank)) first, in that order
+    def __init__(self, *cards):
+        self.cards = cards
+
+    def shuffle(self, deck: array):
+        stacked = [encode(suit, rank) for suit, rank in self.cards]
+        # A shuffled deck is dealt from its end
+        deck[:] = array('B', [code for code in deck if code not in stacked] + stacked[::-1])
+
+
+class ScriptedPolicy:
+    # Take insurance and split when offered, then hit below hit_below and stand otherwise
+    def __init__(self, hit_below: int = 0):
+        self.hit_below = hit_below
+
+    def decide(self, observation) -> str:
+        for action in (INSURANCE, SPLIT):
+            if action in observation.legal_actions:
+                return action
+        return HIT if observation.player_points < self.hit_below else STAND
+
+
+def play_console(policy, rng, answers: list):
+    # One game of blackjack() without pauses or output, answering with answers. Returns the player
+    answers = iter(answers)
+    players = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        blackjack(policy, 80, rng, Screen(ansi=False, stream=io.StringIO()), Pacer("fast"),
+                  read=lambda: next(answers), on_round=players.append)
+    return players[0]
+
+
+# Player 8, 8 against a dealer Ace with a King in the hole. The first split hand stands on 18,
+# the second gets a Five and busts on a Ten
+SPLIT_THEN_BUST = (("Spades", "Eight"), ("Spades", "King"), ("Hearts", "Eight"), ("Spades", "Ace"),
+                   ("Hearts", "Ten"), ("Spades", "Five"), ("Diamonds", "Ten"))
+
+
+def test_insurance_then_split_against_dealer_blackjack():
+    # Player 8, 8 against a dealer Ace with a Ten in the hole, each split hand gets a Two
+    shoe = stacked_shoe(("Spades", "Eight"), ("Spades", "Ten"), ("Hearts", "Eight"), ("Spades", "Ace"),
+                        ("Spades", "Two"), ("Hearts", "Two"))
+    result = engine.play_round(ScriptedPolicy(), 10, shoe)
+    assert result.actions == [INSURANCE, SPLIT, STAND, STAND]
+    assert [hand.outcome for hand in result.hands] == ["lose", "lose"]
+    assert result.insurance_bet == 5
+    # Insurance pays 2x once, whichever split hand is settled last
+    assert result.insurance_payout == 10
+    assert result.net == -15
+
+
+def test_insurance_kept_when_a_later_split_hand_busts():
+    result = engine.play_round(ScriptedPolicy(hit_below=17), 10, stacked_shoe(*SPLIT_THEN_BUST))
+    assert result.actions == [INSURANCE, SPLIT, STAND, HIT]
+    assert [hand.outcome for hand in result.hands] == ["lose", "bust"]
+    assert result.insurance_payout == 10
+    assert result.net == -15
+
+
+def test_console_insurance_kept_when_a_later_split_hand_busts():
+    # The console game settles the same round as the engine: -10 -10 for the hands, -5 + 10 for the insurance
+    player = play_console(ScriptedPolicy(hit_below=17), StackedRandom(*SPLIT_THEN_BUST), ["Mark", "10", "5", "n"])
+    assert player.money == 1000 - 15
+
+
+def test_shoe_running_out_mid_round():
+    # Seven seats on a deep cut single deck run out mid-round: the cards on the table must not be dealt again
+    shoe = Shoe(random.Random(1), decks=1, penetration=0.9)
+    policy = ThresholdPolicy()
+    mid_round = 0
+    for _ in range(500):
+        shuffles, due = shoe.shuffles, shoe.due
+        results = engine.play_table_round([(policy, 10)] * 7, shoe)
+        cards = [card for result in results for hand in result.hands for card in hand.cards] + results[0].dealer_cards
+        assert len(cards) == len(set(cards))
+        if shoe.shuffles - shuffles > due:
+            mid_round += 1
+            assert all(result.reshuffled for result in results)
+    assert mid_round
+
+
+if __name__ == "__main__":
+    test_insurance_then_split_against_dealer_blackjack()
+    test_insurance_kept_when_a_later_split_hand_busts()
+    test_console_insurance_kept_when_a_later_split_hand_busts()
+    test_shoe_running_out_mid_round()
+    print("ok")
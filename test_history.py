@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks for history.py: the bit packing and a log written and mapped back
+# (python3 -m pytest, or python3 test_history.py). Requires numpy.
+
+import os
+import random
+import tempfile
+
+import numpy as np
+
+import engine
+import history
+from policy import StrategyPolicy
+from shoe import Shoe
+
+
+def test_bits_round_trip():
+    rng = random.Random(1)
+    for bits, slots, largest in ((history.CARD_BITS, history.PLAYER_SLOTS, 51),
+                                 (history.ACTION_BITS, history.ACTION_SLOTS, len(history.ACTIONS) - 1)):
+        for count in (0, 1, slots // 2, slots):
+            values = [rng.randint(0, largest) for _ in range(count)]
+            if values:
+                # The largest value a slot holds, every bit set
+                values[0] = (1 << bits) - 1
+            packed = history.pack_bits(values, bits, slots)
+            assert len(packed) == slots * bits // 8
+            field = np.frombuffer(packed, dtype=np.uint8).reshape(1, -1)
+            assert history.unpack_bits(field, bits)[0].tolist() == values + [0] * (slots - count)
+
+
+def test_values_past_the_slots_are_dropped():
+    packed = history.pack_bits(list(range(history.PLAYER_SLOTS + 4)), history.CARD_BITS, history.PLAYER_SLOTS)
+    field = np.frombuffer(packed, dtype=np.uint8).reshape(1, -1)
+    assert history.unpack_bits(field, history.CARD_BITS)[0].tolist() == list(range(history.PLAYER_SLOTS))
+
+
+def test_log_round_trip():
+    # Rounds played by the engine (basic strategy splits and doubles), logged and mapped back
+    shoe = Shoe(random.Random(1), decks=2, penetration=0.75)
+    policy = StrategyPolicy(decks=2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table-0.bjh")
+        results = []
+        with history.HistoryWriter(path, seed="test", decks=2, penetration=0.75, batch=64) as writer:
+            for number in range(500):
+                shuffles, position = shoe.shuffles, shoe.position
+                result = engine.play_round(policy, 10, shoe)
+                writer.write(number, 0, shuffles, position, 10, result)
+                results.append((shuffles, position, result))
+
+        assert history.read_header(path) == {"decks": 2, "penetration": 0.75, "seed": "test"}
+        records = history.read_history(path)
+        assert len(records) == len(results)
+        cards = history.player_cards(records)
+        dealer = history.dealer_cards(records)
+        actions = history.actions(records)
+        for index, (shuffles, position, result) in enumerate(results):
+            record = records[index]
+            assert (record["round"], record["shuffles"], record["position"]) == (index, shuffles, position)
+            assert record["net"] == result.net and record["insurance_bet"] == result.insurance_bet
+            assert bool(record["flags"] & history.RESHUFFLED) == result.reshuffled
+            assert record["hands"] == len(result.hands)
+            player_cards = [card for hand in result.hands for card in hand.cards]
+            assert cards[index][:len(player_cards)].tolist() == player_cards
+            assert dealer[index][:record["dealer_count"]].tolist() == result.dealer_cards
+            assert [history.ACTIONS[action] for action in actions[index][:record["action_count"]]] == result.actions
+            for number, hand in enumerate(result.hands):
+                assert record["hand_counts"][number] == len(hand.cards)
+                outcome = record["hand_outcomes"][number]
+                assert history.OUTCOMES[outcome & (history.DOUBLED - 1)] == hand.outcome
+                assert bool(outcome & history.DOUBLED) == hand.doubled
+        del records, cards, dealer, actions
+
+
+if __name__ == "__main__":
+    test_bits_round_trip()
+    test_values_past_the_slots_are_dropped()
+    test_log_round_trip()
+    print("ok")
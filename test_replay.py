@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks for replay.py: seeking to a round from its rng snapshot finds the game
+# as it was when the session was played (python3 -m pytest, or python3 test_replay.py).
+
+import contextlib
+import io
+import random
+
+from blackjack import blackjack
+from pacing import Pacer
+from replay import Replay
+from screen import Screen
+
+
+def play_session(seed: int, rounds: int) -> tuple:
+    """
+    Play a game answering whatever blackjack() asks, as someone at the keyboard would.
+    Returns the session and, for the start of every round, the player's money and
+    record and the next cards of the deck.
+    """
+    output = io.StringIO()
+    inputs = []
+    starts = []
+    choices = random.Random(seed)
+    asked = 0
+
+    def read() -> str:
+        nonlocal asked
+        question = output.getvalue()[asked:]
+        asked = len(output.getvalue())
+        if "What is your name?" in question:
+            answer = "Mark"
+        elif "insurance bet (" in question:
+            answer = "1"
+        elif "Place your bet" in question:
+            answer = "10"
+        elif "play again" in question:
+            answer = "y" if len(starts) < rounds else "n"
+        else:
+            # Sometimes not a legal action, then it is asked again
+            answer = choices.choice(["h", "s", "d", "p", "i"])
+        inputs.append(answer)
+        return answer
+
+    def on_round(player):
+        starts.append((player.money, player.wins, player.ties, player.losses, player.deck.upcoming(4)))
+
+    with contextlib.redirect_stdout(output):
+        blackjack(rng=random.Random(seed), read=read, on_round=on_round,
+                  screen=Screen(ansi=False, stream=output), pacer=Pacer("fast"))
+    return {"seed": seed, "inputs": inputs}, starts
+
+
+def test_index_finds_every_round():
+    session, starts = play_session(1, 30)
+    rounds = Replay(session).index()
+    assert [(start.money, start.wins, start.ties, start.losses) for start in rounds] == [start[:4] for start in starts]
+    offsets = [start.offset for start in rounds]
+    assert offsets == sorted(offsets) and offsets[-1] < len(session["inputs"])
+
+
+def test_seek_starts_from_the_snapshot():
+    session, starts = play_session(2, 30)
+    replay = Replay(session)
+    for round_number in (0, 1, 14, 29):
+        seen = []
+        replay.inspect(round_number, lambda player: seen.append(
+            (player.money, player.wins, player.ties, player.losses, player.deck.upcoming(4))))
+        assert seen == [starts[round_number]]
+
+
+def test_seek_plays_on_like_the_session():
+    session, starts = play_session(3, 30)
+    seen = []
+    Replay(session).seek(10, lambda player: seen.append(
+        (player.money, player.wins, player.ties, player.losses, player.deck.upcoming(4))), rounds=5)
+    # The rounds played, and the start of the one after them
+    assert seen == starts[10:16]
+
+
+if __name__ == "__main__":
+    test_index_finds_every_round()
+    test_seek_starts_from_the_snapshot()
+    test_seek_plays_on_like_the_session()
+    print("ok")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks for results.py: the chunked scans against the same aggregates worked
+# out on all the rows at once (python3 -m pytest, or python3 test_results.py).
+# Requires numpy.
+
+import tempfile
+
+import numpy as np
+
+import results
+from engine import OUTCOMES
+
+
+def random_rows(count: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    outcome = rng.integers(0, len(OUTCOMES), count)
+    bet = rng.choice([1, 2], count)
+    return {"bet": bet,
+            "outcome": outcome,
+            "player_total": rng.integers(4, 31, count),
+            "dealer_total": rng.integers(17, 27, count),
+            "upcard": rng.integers(2, 12, count),
+            "count": rng.integers(-20, 21, count),
+            "net": np.array([-1.0, -1.0, 0.0, 1.0, 1.5])[outcome] * bet}
+
+
+def write_store(path: str, rows: dict, chunk_rows: int):
+    count = len(rows["bet"])
+    with results.ResultsWriter(path, chunk_rows=chunk_rows) as writer:
+        for index in range(count):
+            writer.append(**{column: values[index] for column, values in rows.items()})
+
+
+def test_scans_match_the_whole_table():
+    rows = random_rows(3500, 1)
+    with tempfile.TemporaryDirectory() as path:
+        # Three full chunks and a short one
+        write_store(path, rows, 1000)
+        store = results.ResultsStore(path)
+        assert store.chunk_rows() == [1000, 1000, 1000, 500] and len(store) == 3500
+
+        rates = results.outcome_rates(store)
+        counts = np.bincount(rows["outcome"], minlength=len(OUTCOMES))
+        assert rates["hands"] == 3500
+        for code, outcome in enumerate(OUTCOMES):
+            assert abs(rates[outcome] - counts[code] / 3500) < 1e-12
+        assert abs(rates["win_rate"] + rates["tie_rate"] + rates["loss_rate"] - 1) < 1e-12
+
+        for upcard, (hands, ev) in results.ev_by_upcard(store).items():
+            seen = rows["upcard"] == upcard
+            assert hands == seen.sum()
+            assert abs(ev - rows["net"][seen].sum() / rows["bet"][seen].sum()) < 1e-9
+
+        # Samples on both sides of chunk boundaries
+        samples, balance = results.bankroll_curve(store, points=36, start=100.0)
+        assert samples[0] == 0 and samples[-1] == 3499 and len(samples) == 36
+        assert np.allclose(balance, 100.0 + np.cumsum(rows["net"])[samples])
+
+
+def test_scan_on_a_process_pool():
+    rows = random_rows(2000, 2)
+    with tempfile.TemporaryDirectory() as path:
+        write_store(path, rows, 300)
+        store = results.ResultsStore(path)
+        alone = store.scan(results._outcome_counts, ("outcome",))
+        pooled = store.scan(results._outcome_counts, ("outcome",), workers=2)
+        assert [counts.tolist() for counts in pooled] == [counts.tolist() for counts in alone]
+        assert np.sum(alone, axis=0).tolist() == np.bincount(rows["outcome"], minlength=len(OUTCOMES)).tolist()
+
+
+def test_chunk_needs_every_column():
+    rows = random_rows(10, 3)
+    with tempfile.TemporaryDirectory() as path:
+        for broken in ({column: values for column, values in rows.items() if column != "net"},
+                       {**rows, "net": rows["net"][:5]}):
+            try:
+                results.write_chunk(path, "000000", **broken)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("a chunk was written with columns missing or of different lengths")
+
+
+if __name__ == "__main__":
+    test_scans_match_the_whole_table()
+    test_scan_on_a_process_pool()
+    test_chunk_needs_every_column()
+    print("ok")
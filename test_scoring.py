@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks for scoring.py: the transition table against the get_points + ace_check way
+# of scoring a hand (python3 -m pytest, or python3 test_scoring.py).
+
+import random
+from itertools import product
+
+import scoring
+from cards import ranks, rank_values
+from scoring import HandTotal
+
+
+def slow_score(hand_ranks) -> tuple:
+    # Sum the hand with Aces as 11 and turn them into 1 one at a time while it is over 21.
+    # A busted hand takes no more cards. Returns (points, soft, bust, blackjack, pair)
+    for count in range(1, len(hand_ranks) + 1):
+        if sum(1 if rank_values[rank] == 11 else rank_values[rank] for rank in hand_ranks[:count]) > 21:
+            hand_ranks = hand_ranks[:count]
+            break
+    points = sum(rank_values[rank] for rank in hand_ranks)
+    aces = sum(1 for rank in hand_ranks if rank_values[rank] == 11)
+    while points > 21 and aces:
+        points -= 10
+        aces -= 1
+    two_cards = len(hand_ranks) == 2
+    return (points, aces > 0, points > 21, two_cards and points == 21 and aces > 0,
+            two_cards and hand_ranks[0] == hand_ranks[1])
+
+
+def table_score(hand_ranks) -> tuple:
+    total = HandTotal()
+    for rank in hand_ranks:
+        total.add(rank)
+    return total.points, total.is_soft, total.bust, total.blackjack, total.pair
+
+
+def test_every_hand_of_up_to_four_cards():
+    for count in range(5):
+        for hand_ranks in product(range(len(ranks)), repeat=count):
+            assert table_score(hand_ranks) == slow_score(hand_ranks), hand_ranks
+
+
+def test_long_hands():
+    # Up to eleven cards (eleven is the most a hand can hold without busting: four Aces, four Twos, three Threes)
+    rng = random.Random(1)
+    for _ in range(20000):
+        hand_ranks = [rng.randrange(len(ranks)) for _ in range(rng.randint(5, 11))]
+        assert table_score(hand_ranks) == slow_score(hand_ranks), hand_ranks
+
+
+def test_score_chains_the_same_transitions():
+    rng = random.Random(2)
+    for _ in range(1000):
+        hand_ranks = [rng.randrange(len(ranks)) for _ in range(rng.randint(0, 6))]
+        state = scoring.score(hand_ranks)
+        points, _, bust, _, _ = slow_score(hand_ranks)
+        assert (scoring.POINTS[state], bool(scoring.BUST[state])) == (points, bust)
+
+
+def test_busted_hands_stay_busted():
+    for state in range(scoring.N_STATES):
+        if scoring.BUST[state]:
+            for rank in range(len(ranks)):
+                assert scoring.NEXT[state * scoring.N_RANKS + rank] == state
+
+
+if __name__ == "__main__":
+    test_every_hand_of_up_to_four_cards()
+    test_long_hands()
+    test_score_chains_the_same_transitions()
+    test_busted_hands_stay_busted()
+    print("ok")
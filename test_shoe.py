@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks for shoe.py (python3 -m pytest, or python3 test_shoe.py).
+
+import random
+
+from blackjack import Deck, card_names
+from cards import DECK_SIZE
+from shoe import Shoe
+
+
+def test_draw_moves_the_cursor_through_one_permutation():
+    shoe = Shoe(random.Random(1), decks=2)
+    dealt = [shoe.draw() for _ in range(2 * DECK_SIZE)]
+    assert shoe.position == 2 * DECK_SIZE and shoe.remaining() == 0
+    assert sorted(dealt) == sorted(list(range(DECK_SIZE)) * 2)
+
+
+def test_reset_rewinds_and_reshuffles_the_same_buffer():
+    shoe = Shoe(random.Random(1))
+    buffer = shoe.cards
+    first = buffer.tolist()
+    for _ in range(10):
+        shoe.draw()
+    shoe.reset()
+    assert shoe.position == 0 and shoe.cards is buffer
+    assert shoe.cards.tolist() != first and sorted(shoe.cards) == list(range(DECK_SIZE))
+
+
+def test_deck_deals_like_the_list_of_cards_it_replaced():
+    # The console game's Deck used to shuffle a list of 52 Cards in order and pop them off its end
+    for seed in range(5):
+        old = card_names[:]
+        random.Random(seed).shuffle(old)
+        deck = Deck()
+        deck.shuffle(random.Random(seed))
+        dealt = [deck.draw_card(faceup=number % 2 == 0) for number in range(DECK_SIZE)]
+        assert [(card.suit, card.rank) for card in dealt] == old[::-1]
+        assert [card.faceup for card in dealt] == [number % 2 == 0 for number in range(DECK_SIZE)]
+        # Reset puts the cards back in order, so the next shuffle deals like a new deck too
+        deck.reset()
+        deck.shuffle(random.Random(seed))
+        assert [(card.suit, card.rank) for card in (deck.draw_card() for _ in range(DECK_SIZE))] == old[::-1]
+
+
+def test_cut_card():
+    # A 6 deck shoe cut at 75% is reshuffled at the start of the first round after the cut card comes out
+    shoe = Shoe(random.Random(1), decks=6, penetration=0.75)
+    assert shoe.cut == 234
+    shoe.start_round()
+    while shoe.position < shoe.cut - 1:
+        shoe.draw()
+    assert not shoe.due and not shoe.start_round()
+    shoe.draw()
+    assert shoe.cut_card_out and shoe.due
+    shuffles = shoe.shuffles
+    assert shoe.start_round()
+    assert shoe.position == 0 and shoe.shuffles == shuffles + 1
+
+
+def test_no_penetration_reshuffles_every_round():
+    shoe = Shoe(random.Random(1))
+    shuffles = shoe.shuffles
+    # Nothing dealt yet, nothing to reshuffle
+    assert not shoe.start_round()
+    shoe.draw()
+    assert shoe.start_round() and shoe.shuffles == shuffles + 1
+
+
+def test_running_out_reshuffles_only_the_discards():
+    shoe = Shoe(random.Random(1), decks=1, penetration=1.0)
+    discards = [shoe.draw() for _ in range(30)]
+    shoe.start_round()
+    in_play = [shoe.draw() for _ in range(22)]
+    shuffles = shoe.shuffles
+    # The 23rd card of the round comes from the 30 discards, the 22 cards on the table stay out
+    rest = [shoe.draw() for _ in range(30)]
+    assert shoe.shuffles == shuffles + 1
+    assert sorted(rest) == sorted(discards)
+    assert shoe.cards[:22].tolist() == in_play
+
+
+def test_running_out_twice_in_one_round():
+    # 10 cards are discards when the round starts: the 43rd card reshuffles them, the 53rd has nothing left
+    shoe = Shoe(random.Random(1), decks=1, penetration=1.0)
+    for _ in range(10):
+        shoe.draw()
+    shoe.start_round()
+    dealt = [shoe.draw() for _ in range(52)]
+    assert sorted(dealt) == list(range(52))
+    try:
+        shoe.draw()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("a round dealt more cards than the shoe holds")
+
+
+if __name__ == "__main__":
+    test_draw_moves_the_cursor_through_one_permutation()
+    test_reset_rewinds_and_reshuffles_the_same_buffer()
+    test_deck_deals_like_the_list_of_cards_it_replaced()
+    test_cut_card()
+    test_no_penetration_reshuffles_every_round()
+    test_running_out_reshuffles_only_the_discards()
+    test_running_out_twice_in_one_round()
+    print("ok")